@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from server import SputnikLogSystem
+
+
+class _CommandProtocol(asyncio.DatagramProtocol):
+    def __init__(self, commands: asyncio.Queue):
+        self._commands = commands
+
+    def datagram_received(self, data, addr):
+        self._commands.put_nowait(data)
+
+    def error_received(self, exc):
+        print(exc)
+
+
+class AsyncSputnikLogSystem(SputnikLogSystem):
+    def __init__(self, *args, **kwargs):
+        """Вариант SputnikLogSystem на asyncio.
+
+        Генерация телеметрии, прием команд и отправка работают в отдельных
+        задачах, поэтому не блокируют друг друга. Команды передаются через
+        asyncio.Queue, а на отправку - через ту же ограниченную DownlinkQueue
+        с приоритетами, что и в поточной версии (повтор getlog ждет места
+        в очереди в своем потоке). Отправитель не опрашивает очередь, а ждет
+        asyncio.Event, который очередь взводит через call_soon_threadsafe.
+        Формат сообщений и обработка getlog те же.
+        """
+
+        super().__init__(*args, **kwargs)
+
+        self._loop = None
+        self._transport = None
+
+    async def _producer(self):
+        while True:
+            # тики по тому же расписанию FixedRateTicker, что и в поточной версии
+            await asyncio.sleep(self._ticker.delay())
+
+            # при политике "block" постановка в очередь может ждать места
+            await self._loop.run_in_executor(None, self._generate_telemetry)
+
+    async def _command_receiver(self, commands: asyncio.Queue):
+        while True:
+            data = await commands.get()
+            req_msg = self._parse_command(data)
+            if not req_msg:
+                continue
+
+            # чтение лога идет в потоке повтора, здесь он только запускается
+            self._handle_command(req_msg)
+
+    async def _sender(self):
+        ready = asyncio.Event()
+        self._fifo_queue.set_on_ready(
+            lambda: self._loop.call_soon_threadsafe(ready.set)
+        )
+        if len(self._fifo_queue):
+            ready.set()
+
+        try:
+            while True:
+                await ready.wait()
+                # сброс до drain: сообщения, пришедшие после него, снова взведут событие
+                ready.clear()
+                self._send_queued()
+        finally:
+            self._fifo_queue.set_on_ready(None)
+
+    def _send_queued(self):
+        msgs_to_send = self._fifo_queue.drain()
+        if not msgs_to_send:
+            return
+
+        started = time.perf_counter()
+
+        datagrams = self._pack_datagrams(msgs_to_send)
+        for datagram in datagrams:
+            self._transport.sendto(datagram, (self.gs_ip, self.gs_port))
+
+        self._count_sent(msgs_to_send, datagrams, started)
+
+        for msg_to_send in msgs_to_send:
+            print(f'Sent: "{msg_to_send}"')
+
+    async def run_async(self):
+        self._loop = asyncio.get_running_loop()
+        commands = asyncio.Queue()
+
+        self._transport, _ = await self._loop.create_datagram_endpoint(
+            lambda: _CommandProtocol(commands), sock=self._udp_sock
+        )
+
+        try:
+            await asyncio.gather(
+                self._producer(),
+                self._command_receiver(commands),
+                self._sender(),
+            )
+        finally:
+            self._transport.close()
+
+    def run(self):
+        """Запуск системы логов космического аппарата в цикле asyncio. Блокирующий вызов!"""
+
+        self._start_metrics()
+        try:
+            asyncio.run(self.run_async())
+        finally:
+            self.close()
+
+
+def main():
+    sputnik = AsyncSputnikLogSystem("127.0.0.1", 5001, "127.0.0.1", 5002)
+    sputnik.run()
+
+
+if __name__ == "__main__":
+    main()
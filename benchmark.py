@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Бенчмарки канала телеметрии SputnikLogSystem -> GroundLogSystem.
+
+Запуск: python benchmark.py [--sizes 10000,1000000,10000000] [--output bench_output.json]
+
+Результаты пишутся в JSON вместе с хешем коммита, чтобы сравнивать их между
+коммитами.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading as thr
+import time
+
+from datetime import datetime, timedelta
+
+from binary_log import text_to_binary
+from client import GroundLogSystem
+from message_types import RequestMessage
+from server import SputnikLogSystem
+from tools import (
+    calc_checksums,
+    calc_line_checksum,
+    make_checksum,
+    pack_datagrams,
+    verify_checksums,
+)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _close(system):
+    system._udp_sock.close()
+    system._log_writer.close()
+
+
+def bench_downlink(tmp_dir, count):
+    """Пропускная способность и задержка доставки по loopback UDP.
+
+    recv_time в сообщении хранит целые секунды, поэтому задержка считается
+    от метки времени в самом сообщении до момента разбора на наземной станции.
+    """
+
+    gs_port, sls_port = _free_port(), _free_port()
+    sputnik = SputnikLogSystem(
+        "127.0.0.1",
+        gs_port,
+        "127.0.0.1",
+        sls_port,
+        log_filename=os.path.join(tmp_dir, "downlink_server.log"),
+        queue_maxlen=count,
+    )
+    ground = GroundLogSystem(
+        "127.0.0.1",
+        gs_port,
+        "127.0.0.1",
+        sls_port,
+        log_filename=os.path.join(tmp_dir, "downlink_client.log"),
+    )
+    ground._udp_sock.settimeout(1.0)
+
+    latencies = []
+    received = 0
+    last_recv = None
+
+    def receiver():
+        nonlocal received, last_recv
+        while received < count:
+            msgs = ground._get_msg()
+            if not msgs and last_recv and time.time() - last_recv > 1.0:
+                break
+
+            now = time.time()
+            for msg in msgs:
+                sent = datetime.fromisoformat(msg.date + "T" + msg.time).timestamp()
+                latencies.append(now - sent)
+            received += len(msgs)
+            if msgs:
+                last_recv = now
+
+    receiver_thr = thr.Thread(target=receiver)
+    receiver_thr.start()
+    sputnik._sender_msg_thr.start()
+
+    start = time.time()
+    for _ in range(count):
+        sputnik._enqueue(sputnik.generate_online_message())
+    receiver_thr.join()
+
+    _close(sputnik)
+    _close(ground)
+
+    elapsed = (last_recv or time.time()) - start
+    return {
+        "sent": count,
+        "received": received,
+        "messages_per_second": received / elapsed if elapsed > 0 else None,
+        "latency_p50_ms": 1000 * (_percentile(latencies, 50) or 0),
+        "latency_p99_ms": 1000 * (_percentile(latencies, 99) or 0),
+        "queue": sputnik._fifo_queue.stats(),
+    }
+
+
+def _write_log(filename, size):
+    """Лог из size строк, последняя запись - текущий момент, шаг 1 мс"""
+
+    now = datetime.now()
+    step = timedelta(milliseconds=1)
+    with open(filename, "w") as file:
+        for i in range(size):
+            dtm = now - step * (size - i)
+            device = 3 if i % 2 else 2
+            file.write(f"{dtm} log {device} temperature {i % 50}\n")
+
+
+def bench_getlog(tmp_dir, size, interval=5):
+    text_filename = os.path.join(tmp_dir, f"getlog_{size}.log")
+    binary_filename = os.path.join(tmp_dir, f"getlog_{size}.blog")
+    _write_log(text_filename, size)
+    text_to_binary(text_filename, binary_filename)
+
+    req_msg = RequestMessage("getlog", interval, 3, "temperature")
+    results = {}
+    for name, kwargs in (
+        ("index", {"log_filename": text_filename}),
+        ("tail", {"log_filename": text_filename, "use_index": False}),
+        ("binary", {"log_filename": binary_filename, "log_format": "binary"}),
+    ):
+        start = time.perf_counter()
+        sputnik = SputnikLogSystem(
+            "127.0.0.1", _free_port(), "127.0.0.1", _free_port(), **kwargs
+        )
+        startup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        replayed = sum(1 for _ in sputnik._iter_replay(req_msg, thr.Event()))
+        results[name] = {
+            "startup_seconds": startup,
+            "getlog_seconds": time.perf_counter() - start,
+            "replayed": replayed,
+        }
+        _close(sputnik)
+
+    os.remove(text_filename)
+    os.remove(binary_filename)
+    return results
+
+
+def _lines_per_second(function, lines, count):
+    """Строк в секунду при подсчете сумм пачками по len(lines) строк"""
+
+    repeat = max(count // len(lines), 1)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(lines)
+    return repeat * len(lines) / (time.perf_counter() - start)
+
+
+def bench_checksum(count):
+    """Суммы по одной и пачкой: на размере датаграммы и на размере проверки лога.
+
+    На датаграмме calc_checksums должен совпадать с построчным подсчетом
+    (пачка меньше CHECKSUM_BATCH_MIN), на больших пачках - обгонять его.
+    """
+
+    def by_line(lines):
+        return [calc_line_checksum(line) for line in lines]
+
+    lines = [f"{datetime.now()} online 2 voltage {i / 7:.3f}" for i in range(count)]
+    msgs = [SputnikLogSystem.generate_online_message() for _ in range(100)]
+    datagram = [msg["message"] for msg in json.loads(pack_datagrams(msgs)[0])]
+
+    results = {"datagram_lines": len(datagram)}
+    for name, batch in (("datagram", datagram), ("log", lines)):
+        results[f"{name}_line_per_second"] = _lines_per_second(by_line, batch, count)
+        results[f"{name}_batch_per_second"] = _lines_per_second(
+            calc_checksums, batch, count
+        )
+
+    start = time.perf_counter()
+    for line in lines:
+        make_checksum(line.split(" "), "crc32")
+    results["crc32_per_second"] = count / (time.perf_counter() - start)
+
+    return results
+
+
+def bench_parse(tmp_dir, count):
+    """Разбор датаграмм наземной станцией: JSON, проверка сумм, Message"""
+
+    msgs = [SputnikLogSystem.generate_online_message() for _ in range(count)]
+    datagrams = pack_datagrams(msgs)
+
+    start = time.perf_counter()
+    for datagram in datagrams:
+        lines = [msg["message"] for msg in json.loads(datagram)]
+        verify_checksums(lines)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "datagrams": len(datagrams),
+        "messages_per_second": count / elapsed,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,1000000,10000000")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--output", default="bench_output.json")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = {
+        "commit": _git_commit(),
+        "datetime": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # SputnikLogSystem печатает каждое отправленное сообщение
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results["downlink"] = bench_downlink(tmp_dir, args.messages)
+            results["getlog"] = {
+                str(size): bench_getlog(tmp_dir, size) for size in sizes
+            }
+            results["checksum"] = bench_checksum(args.messages)
+            results["parse"] = bench_parse(tmp_dir, args.messages)
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import mmap
+import struct
+import sys
+
+from datetime import datetime, timedelta
+
+# время (мкс от эпохи), device, source, sensor, failure, флаги, значение
+RECORD = struct.Struct("<qIHHHBd")
+_TIMESTAMP = struct.Struct("<q")
+
+FLAG_INTEGER = 0x01
+
+# метки времени в логе без часового пояса, поэтому считаем от наивной эпохи
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(dtm: datetime) -> int:
+    return (dtm - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(epoch_us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=epoch_us)
+
+
+class StringTable:
+    def __init__(self, filename: str):
+        """Таблица интернированных строк (source, sensor, коды отказов).
+
+        Хранится рядом с логом в <filename>.strings по одной строке на id,
+        id 0 зарезервирован под пустую строку.
+        """
+
+        self.filename = filename + ".strings"
+        self._strings = [""]
+        self._ids = {"": 0}
+
+        try:
+            with open(self.filename, "r") as file:
+                for line in file:
+                    self._add(line.rstrip("\n"))
+        except FileNotFoundError:
+            pass
+
+    def _add(self, value: str) -> int:
+        self._ids[value] = len(self._strings)
+        self._strings.append(value)
+        return self._ids[value]
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is not None:
+            return string_id
+
+        with open(self.filename, "a") as file:
+            file.write(value + "\n")
+        return self._add(value)
+
+    def get_id(self, value: str) -> int | None:
+        return self._ids.get(value)
+
+    def copy_to(self, filename: str):
+        """Копирует таблицу к другому логу, например к файлу после ротации"""
+
+        with open(filename + ".strings", "w") as file:
+            file.writelines(value + "\n" for value in self._strings[1:])
+
+    def __getitem__(self, string_id: int) -> str:
+        return self._strings[string_id]
+
+
+def encode_record(line: str, strings: StringTable) -> bytes:
+    """Кодирует текстовую строку лога в запись фиксированной длины"""
+
+    dt, tm, src, device, sensor, value = line.split(" ")
+    epoch_us = to_epoch_us(datetime.fromisoformat(dt + "T" + tm))
+
+    flags = 0
+    failure = 0
+    try:
+        number = float(value)
+        if value.lstrip("-").isdigit():
+            flags |= FLAG_INTEGER
+    except ValueError:
+        number = 0.0
+        failure = strings.intern(value)
+
+    return RECORD.pack(
+        epoch_us,
+        int(device),
+        strings.intern(src),
+        strings.intern(sensor),
+        failure,
+        flags,
+        number,
+    )
+
+
+def decode_record(buffer, offset: int, strings: StringTable) -> str:
+    """Восстанавливает текстовую строку лога из записи по смещению offset"""
+
+    epoch_us, device, src, sensor, failure, flags, number = RECORD.unpack_from(
+        buffer, offset
+    )
+    if failure:
+        value = strings[failure]
+    elif flags & FLAG_INTEGER:
+        value = str(int(number))
+    else:
+        value = str(number)
+
+    return f"{from_epoch_us(epoch_us)} {strings[src]} {device} {strings[sensor]} {value}"
+
+
+def _find_first_after(mm, count: int, since_us: int) -> int:
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _TIMESTAMP.unpack_from(mm, mid * RECORD.size)[0] <= since_us:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def find_offset_since(filename: str, since_us: int) -> int:
+    """Смещение первой записи бинарного лога позже since_us"""
+
+    try:
+        file = open(filename, "rb")
+    except FileNotFoundError:
+        return 0
+
+    with file:
+        try:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return 0
+
+        with mm:
+            return _find_first_after(mm, len(mm) // RECORD.size, since_us) * RECORD.size
+
+
+def iter_binary_log_since(
+    filename: str, since_us: int, device=None, sensor=None, start=0, stop=None
+):
+    """Текстовые строки бинарного лога, записанные после since_us.
+
+    Записи фиксированной длины, поэтому начало интервала находится бинарным
+    поиском по номеру записи, а поля читаются прямо из mmap без копирования.
+    start и stop ограничивают чтение записями, которые начинаются
+    в байтах [start, stop) файла.
+    """
+
+    strings = StringTable(filename)
+    sensor_id = None
+    if sensor is not None:
+        sensor_id = strings.get_id(str(sensor))
+        if sensor_id is None:
+            return
+    device = None if device is None else int(device)
+
+    try:
+        file = open(filename, "rb")
+    except FileNotFoundError:
+        return
+
+    with file:
+        try:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+
+        with mm:
+            # недописанная последняя запись игнорируется
+            count = len(mm) // RECORD.size
+            # части файла начинаются с первой целой записи
+            first = _find_first_after(mm, count, since_us)
+            first = max(first, -(-start // RECORD.size))
+            if stop is not None:
+                count = min(count, -(-stop // RECORD.size))
+
+            for i in range(first, count):
+                offset = i * RECORD.size
+                _, rec_device, _, rec_sensor, _, _, _ = RECORD.unpack_from(mm, offset)
+                if device is not None and rec_device != device:
+                    continue
+                if sensor_id is not None and rec_sensor != sensor_id:
+                    continue
+
+                yield decode_record(mm, offset, strings)
+
+
+def text_to_binary(src_filename: str, dst_filename: str):
+    strings = StringTable(dst_filename)
+    with open(src_filename, "r") as src, open(dst_filename, "wb") as dst:
+        for line in src:
+            line = line.strip()
+            if line:
+                dst.write(encode_record(line, strings))
+
+
+def binary_to_text(src_filename: str, dst_filename: str):
+    with open(dst_filename, "w") as dst:
+        for line in iter_binary_log_since(src_filename, -(2**63)):
+            dst.write(line + "\n")
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-binary", "to-text"):
+        print("Использование: binary_log.py to-binary|to-text <источник> <результат>")
+        sys.exit(1)
+
+    command, src_filename, dst_filename = sys.argv[1:]
+    if command == "to-binary":
+        text_to_binary(src_filename, dst_filename)
+    else:
+        binary_to_text(src_filename, dst_filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import itertools
+import sched
+import selectors
 import socket
 import time
 import json
@@ -6,8 +9,16 @@ import threading as thr
 from collections import deque
 from datetime import datetime
 
-from message_types import Message
-from tools import calc_checksum
+from log_reader import iter_log_since
+from log_writer import LogWriter
+from message_types import MESSAGE_FIELDS, Message
+from metrics import MetricsRegistry, MetricsServer
+from rolling_stats import RollingStats
+from sequencing import LIVE_STREAM, SequenceTracker
+from telemetry_store import TelemetryStore
+from udp_io import DatagramReceiver
+from tools import DEFAULT_MTU, verify_checksums
+from wire import decode_datagram, is_binary
 
 
 class GroundLogSystem:
@@ -19,6 +30,23 @@ class GroundLogSystem:
         sls_ip,
         sls_port,
         log_filename="client.log",
+        mtu=DEFAULT_MTU,
+        log_flush_interval=1.0,
+        log_max_bytes=0,
+        log_rotate_interval=0,
+        session_start: datetime | None = None,
+        request_interval=0.5,
+        max_inflight=8,
+        request_timeout=10.0,
+        max_retries=3,
+        store_filename=None,
+        rcvbuf=1 << 20,
+        reorder_window=64,
+        reorder_timeout=0.2,
+        sock=None,
+        stats_windows=(60, 300, 3600),
+        stats_buckets=60,
+        metrics_port=None,
     ):
         """Класс для управления логами космического аппарата с наземной станции"""
 
@@ -29,9 +57,33 @@ class GroundLogSystem:
         self.gs_port = int(gs_port)
 
         self.log_filename = log_filename
+        self.mtu = int(mtu)
+
+        # файл лога открыт постоянно, записи сбрасываются группами
+        self._log_writer = LogWriter(
+            self.log_filename,
+            flush_interval=log_flush_interval,
+            max_bytes=log_max_bytes,
+            rotate_interval=log_rotate_interval,
+        )
+
+        # необязательное хранилище SQLite для запросов по (device, sensor, времени)
+        self._store = TelemetryStore(store_filename) if store_filename else None
+
+        # готовый сокет передает пул наземной станции (ground_pool.py): он сам
+        # принимает датаграммы и раздает их по адресу космического аппарата
+        if sock is None:
+            self._udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp_sock.bind((self.gs_ip, self.gs_port))
 
-        self._udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._udp_sock.bind((self.gs_ip, self.gs_port))
+            # прием в заранее выделенные буферы, rcvbuf - размер буфера сокета в ядре
+            self._receiver = DatagramReceiver(
+                self._udp_sock, self.mtu, rcvbuf=rcvbuf
+            )
+        else:
+            self._udp_sock = sock
+            self._receiver = None
+        self._kernel_dropped = 0
 
         self._handle_telemetry_thr = thr.Thread(target=self._message_handler)
         self._handle_telemetry_thr.daemon = True
@@ -39,37 +91,155 @@ class GroundLogSystem:
         self._request_queue = deque()
         self._request_queue_lock = thr.Lock()
 
-        self._last_request_time = time.time()
-        self._start_datetime = datetime.now()
+        # таймеры цикла приема: раз в request_interval из очереди отправляются
+        # новые запросы getlog (не больше max_inflight одновременно), а запросы
+        # без новых сообщений дольше request_timeout отправляются заново до max_retries раз
+        self.request_interval = float(request_interval)
+        self.max_inflight = int(max_inflight)
+        self.request_timeout = float(request_timeout)
+        self.max_retries = int(max_retries)
+        self._scheduler = sched.scheduler(time.monotonic, time.sleep)
+
+        # request_id -> состояние запроса getlog, ожидающего log_end
+        self._request_ids = itertools.count(1)
+        self._inflight = {}
+
+        # порядок нумерованных сообщений по потокам (живая телеметрия и повторы
+        # по request_id): повторы отбрасываются, пропуски дольше reorder_timeout
+        # или больше окна reorder_window дозапрашиваются командой resend
+        self.reorder_window = int(reorder_window)
+        self.reorder_timeout = float(reorder_timeout)
+        self._sequences = {}
+
+        # начало сессии для printfails; счетчики отказов по device ведутся
+        # по мере приема сообщений и при необходимости восстанавливаются из лога
+        self._session_start = session_start
+        self._start_datetime = session_start or datetime.now()
+        self._failure_counts = {}
+        self._failure_counts_lock = thr.Lock()
+
+        # скользящие агрегаты живой телеметрии по (device, sensor) за окна stats_windows секунд
+        self._stats = RollingStats(stats_windows, stats_buckets)
+
+        # метрики станции, при metrics_port отдаются по HTTP на 127.0.0.1
+        # в формате Prometheus (0 - свободный порт)
+        self.metrics_port = metrics_port
+        self._metrics_server = None
+        self.metrics = MetricsRegistry("ground_")
+        self._init_metrics()
+
+    def _init_metrics(self):
+        metrics = self.metrics
+        metrics.gauge(
+            "getlog_inflight",
+            "getlog requests waiting for log_end",
+            lambda: len(self._inflight),
+        )
+        metrics.gauge(
+            "getlog_queued",
+            "getlog requests waiting to be sent",
+            lambda: len(self._request_queue),
+        )
+        metrics.counter(
+            "kernel_dropped_total",
+            "Datagrams dropped by the kernel socket buffer",
+            lambda: self._kernel_dropped,
+        )
+        self._received_datagrams = metrics.counter(
+            "received_datagrams_total", "Datagrams received"
+        )
+        self._received_bytes = metrics.counter(
+            "received_bytes_total", "Datagram bytes received"
+        )
+        self._received_messages = metrics.counter(
+            "received_messages_total", "Messages decoded from datagrams"
+        )
+        self._checksum_failures = metrics.counter(
+            "checksum_failures_total", "Messages with a wrong checksum"
+        )
+        self._json_errors = metrics.counter(
+            "json_decode_errors_total", "Datagrams that are not valid JSON"
+        )
+        self._log_records = metrics.counter(
+            "log_records_total", "Records written to the ground log"
+        )
+        self._getlog_seconds = metrics.histogram(
+            "getlog_seconds", "Time from sending getlog to receiving all its records"
+        )
+
+    def _start_metrics(self):
+        if self.metrics_port is None or self._metrics_server is not None:
+            return
 
-    def _get_msg(self):
-        """Получение сообщения через UDP и его десериализация в Message"""
+        self._metrics_server = MetricsServer(self.metrics, port=self.metrics_port)
+        self._metrics_server.start()
+        host, port = self._metrics_server.address
+        print(f"Metrics: http://{host}:{port}/metrics")
+
+    def _get_msg(self) -> list[Message]:
+        """Получение датаграммы через UDP и ее десериализация в список Message.
+
+        Датаграмма либо бинарная (wire.py, определяется по первому байту),
+        либо содержит одно JSON-сообщение или JSON-массив сообщений.
+        """
 
         try:
-            data = self._udp_sock.recv(1024)
-            msg = json.loads(data)
-        except (json.JSONDecodeError, TimeoutError, ConnectionError) as e:
+            data = self._receiver.receive()
+        except (TimeoutError, ConnectionError) as e:
             print(e)
-            return None
+            return []
 
-        if not msg.get("message"):
-            return None
+        return self._parse_datagram(data)
 
-        message = Message(*msg["message"].split(" "))
-        if int(message.checksum) != calc_checksum(
-            message.date,
-            message.time,
-            message.source,
-            message.device,
-            message.sensor,
-            message.value,
-        ):
-            print(f"Packet at { message.date} {message.time} is broken")
-            return None
+    def _parse_datagram(self, data) -> list[Message]:
+        self._received_datagrams.inc()
+        self._received_bytes.inc(len(data))
 
-        return message
+        if is_binary(data):
+            messages = decode_datagram(data)
+        else:
+            messages = self._parse_json_datagram(bytes(data))
+
+        self._received_messages.inc(len(messages))
+        return messages
+
+    def _parse_json_datagram(self, data: bytes) -> list[Message]:
+        try:
+            msgs = json.loads(data)
+        except json.JSONDecodeError as e:
+            print(e)
+            self._json_errors.inc()
+            return []
+
+        if isinstance(msgs, dict):
+            msgs = [msgs]
+
+        msgs = [
+            msg
+            for msg in msgs
+            if isinstance(msg, dict) and isinstance(msg.get("message"), str)
+        ]
+        lines = [msg["message"] for msg in msgs]
+
+        # контрольные суммы всей датаграммы проверяются одной пачкой
+        messages = []
+        for msg, line, valid in zip(msgs, lines, verify_checksums(lines)):
+            fields = line.split(" ")
+            if len(fields) != MESSAGE_FIELDS:
+                continue
+
+            message = Message(
+                *fields, request_id=msg.get("request_id"), seq=msg.get("seq")
+            )
+            if not valid:
+                print(f"Packet at { message.date} {message.time} is broken")
+                self._checksum_failures.inc()
+                continue
+
+            messages.append(message)
+
+        return messages
 
-    @staticmethod
     def _format_online(self, message: Message) -> dict:
         """Форматирует сообщение для вывода в стандартный поток / файл"""
 
@@ -83,6 +253,9 @@ class GroundLogSystem:
     def _handle_message(self, message: Message):
         """Обработка принятого сообщения"""
 
+        if message.request_id is not None:
+            self._track_request(message)
+
         output = None
         if message.source == "online":
             output = self._format_online(message)
@@ -90,6 +263,22 @@ class GroundLogSystem:
             output = self._format_chart_recorder(message)
 
         if output:
+            dtm = datetime.fromisoformat(message.date + "T" + message.time)
+            if "failure" in output:
+                self._count_failure(message.device, message.value, dtm)
+
+            # скользящие агрегаты только по живой телеметрии: записи getlog
+            # повторяют уже учтенные (и друг друга при пересечении запросов),
+            # а log_start / log_end датчика system - служебные
+            if message.source == "online" and message.sensor != "system":
+                self._stats.add(
+                    message.device,
+                    message.sensor,
+                    dtm.timestamp(),
+                    message.value,
+                    self._is_failure(message.value),
+                )
+
             print(output)
             self._save_log(
                 dt=message.date,
@@ -100,24 +289,160 @@ class GroundLogSystem:
                 val=message.value,
             )
 
-    def _message_handler(self):
-        """Обработчик сообщений. Необходимо запускать в отдельном потоке."""
-        while 1:
-            msg = self._get_msg()
-            if msg:
+    def _new_sequence(self, next_seq=None) -> SequenceTracker:
+        return SequenceTracker(next_seq, self.reorder_window, self.reorder_timeout)
+
+    def _receive_msg(self, message: Message):
+        """Передает сообщения в _handle_message в порядке seq их потока"""
+
+        if message.seq is None:
+            self._handle_message(message)
+            return
+
+        stream = LIVE_STREAM if message.request_id is None else message.request_id
+        tracker = self._sequences.get(stream)
+        if tracker is None:
+            if stream != LIVE_STREAM:
+                # повтор уже завершенного запроса, порядок не отслеживается
+                self._handle_message(message)
+                return
+            tracker = self._sequences[stream] = self._new_sequence()
+
+        released, gaps = tracker.push(int(message.seq), message, time.monotonic())
+        for msg in released:
+            self._handle_message(msg)
+        if gaps:
+            self._send_resend(message.request_id, gaps)
+
+    def _check_sequences(self):
+        """Таймер: дозапрашивает пропуски, не заполнившиеся за reorder_timeout"""
+
+        now = time.monotonic()
+        for stream, tracker in list(self._sequences.items()):
+            released, gaps = tracker.expire(now)
+            for msg in released:
                 self._handle_message(msg)
+            if gaps:
+                self._send_resend(None if stream == LIVE_STREAM else stream, gaps)
+
+        self._scheduler.enter(self.reorder_timeout, 0, self._check_sequences)
+
+    def _drain_msgs(self):
+        """Обрабатывает все датаграммы, уже лежащие в буфере сокета"""
+
+        while True:
+            datagrams = self._receiver.drain()
+            for data in datagrams:
+                for msg in self._parse_datagram(data):
+                    self._receive_msg(msg)
+
+            if len(datagrams) < self._receiver.buffer_count:
+                break
+
+        dropped = self._receiver.kernel_dropped
+        if dropped is not None and dropped > self._kernel_dropped:
+            print(f"Kernel dropped {dropped - self._kernel_dropped} datagrams")
+            self._kernel_dropped = dropped
+
+    def _dispatch_request(self):
+        """Таймер: перезапрашивает зависшие запросы getlog, отправляет новые и перезапускает себя"""
+
+        now = time.monotonic()
+        for request_id, request in list(self._inflight.items()):
+            if now - request["active_at"] < self.request_timeout:
+                continue
+
+            if request["retries"] >= self.max_retries:
+                print(f"Request {request_id} timed out: {request['params']}")
+                del self._inflight[request_id]
+                self._sequences.pop(request_id, None)
+                continue
+
+            request["retries"] += 1
+            request["active_at"] = now
+
+            tracker = self._sequences.get(request_id)
+            if tracker is not None and tracker.next_seq > 1:
+                # дозапрашиваются только пропуски и хвост после последнего
+                # принятого сообщения (например потерянный log_end)
+                self._send_resend(
+                    request_id, tracker.missing_ranges() + [(tracker.next_seq, None)]
+                )
+                continue
+
+            # повтор начнется заново с log_start
+            request["received"] = 0
+            self._sequences[request_id] = self._new_sequence(1)
+            self._send_log_request(*request["params"], request_id=request_id)
+
+        while len(self._inflight) < self.max_inflight:
+            with self._request_queue_lock:
+                req_msg = self._request_queue.popleft() if self._request_queue else None
+            if not req_msg:
+                break
+
+            request_id = next(self._request_ids)
+            self._inflight[request_id] = {
+                "params": req_msg,
+                "sent_at": now,
+                "active_at": now,
+                "retries": 0,
+                "received": 0,
+            }
+            self._sequences[request_id] = self._new_sequence(1)
+            self._send_log_request(*req_msg, request_id=request_id)
+
+        self._scheduler.enter(self.request_interval, 0, self._dispatch_request)
+
+    def _track_request(self, message: Message):
+        """Учет сообщений повтора по request_id, log_end завершает запрос"""
+
+        request = self._inflight.get(message.request_id)
+        if request is None:
+            return
+
+        # таймаут считается от последнего принятого сообщения запроса
+        request["active_at"] = time.monotonic()
+        if message.sensor != "system":
+            request["received"] += 1
+        elif message.value == "log_end":
+            request["ended"] = True
+
+        # log_end мог прийти раньше дозапрошенных пропусков
+        tracker = self._sequences.get(message.request_id)
+        if request.get("ended") and not (tracker and tracker.has_missing()):
+            print(
+                f"Request {message.request_id} completed: {request['received']} records"
+            )
+            self._getlog_seconds.observe(time.monotonic() - request["sent_at"])
+            del self._inflight[message.request_id]
+            self._sequences.pop(message.request_id, None)
+
+    def _start_timers(self):
+        self._scheduler.enter(self.request_interval, 0, self._dispatch_request)
+        self._scheduler.enter(self.reorder_timeout, 0, self._check_sequences)
 
-            if time.time() - self._last_request_time > 3.0:
+    def _message_handler(self):
+        """Обработчик сообщений. Необходимо запускать в отдельном потоке.
+
+        Поток спит в select до прихода датаграмм или до ближайшего таймера,
+        при пробуждении вычитывает все накопившиеся датаграммы.
+        """
+
+        self._udp_sock.setblocking(False)
+        selector = selectors.DefaultSelector()
+        selector.register(self._udp_sock, selectors.EVENT_READ)
 
-                with self._request_queue_lock:
-                    req_msg = (
-                        self._request_queue.popleft() if self._request_queue else None
-                    )
-                if req_msg:
-                    self._send_log_request(*req_msg)
-                    self._last_request_time = time.time()
+        self._start_timers()
+
+        while 1:
+            timeout = self._scheduler.run(blocking=False)
+            if selector.select(timeout):
+                self._drain_msgs()
 
-            time.sleep(0.05)
+    @staticmethod
+    def _is_failure(value: str) -> bool:
+        return any(level in value.lower() for level in ("warning", "error"))
 
     def _format_chart_recorder(self, message: Message) -> dict:
         """Форматирует сообщение для вывода в стандартный поток / файл"""
@@ -125,22 +450,45 @@ class GroundLogSystem:
             "device": message.device,
             "sensor": message.sensor,
         }
-        if any(level in message.value.lower() for level in ("warning", "error")):
+        if self._is_failure(message.value):
             log["failure"] = message.value
         else:
             log["value"] = message.value
         return log
 
+    @staticmethod
+    def _received_timestamp(line: bytes) -> float | None:
+        # время приема rt=<epoch> в начале строки client.log
+        field = line.split(b" ", 1)[0]
+        if not field.startswith(b"rt="):
+            return None
+        try:
+            return float(field[3:])
+        except ValueError:
+            return None
+
     def _save_log(self, **kwargs):
-        with open(self.log_filename, "a") as file:
-            file.write(
-                " ".join((f"{key}={value}" for key, value in kwargs.items())) + "\n"
-            )
+        # время приема в начале строки: по нему строки упорядочены в файле
+        # (время записи у повторов getlog старое), см. _rebuild_failure_counts
+        self._log_writer.write(
+            f"rt={time.time():.6f} "
+            + " ".join((f"{key}={value}" for key, value in kwargs.items()))
+        )
+        self._log_records.inc()
+
+        if self._store is not None:
+            self._store.save(**kwargs)
 
     def _handle_request(self, request_log):
         len_req_log = len(request_log)
 
-        if len_req_log == 3:
+        if request_log[0] in ("query", "dbfails"):
+            self._handle_store_request(request_log)
+
+        elif request_log[0] == "stats":
+            self._handle_stats_request(request_log[1:])
+
+        elif len_req_log == 3:
             interval, device, sensor = request_log
             if interval.isnumeric() and device.isnumeric() and not sensor.isspace():
                 self._request_queue.append((int(interval), int(device), sensor))
@@ -150,6 +498,49 @@ class GroundLogSystem:
             errors, warnings = self._get_failure_count(device)
             print(f"Session errors: {errors} || Session warnings: {warnings}")
 
+    def _handle_stats_request(self, args):
+        """Команда stats <device> <sensor>: скользящие агрегаты пары по окнам"""
+
+        if len(args) != 2:
+            return
+
+        device, sensor = args
+        summary = self._stats.summary(device, sensor, time.time())
+        if summary is None:
+            print(f"Нет данных: device {device} sensor {sensor}")
+            return
+
+        for window, stats in summary.items():
+            last = stats.pop("last")
+            values = " ".join(
+                f"{key}={'-' if value is None else f'{value:g}'}"
+                for key, value in stats.items()
+            )
+            print(f"{window:g}s: {values} last={last}")
+
+    def _handle_store_request(self, request_log):
+        """Команды к хранилищу SQLite: query <interval> <device> <sensor>, dbfails <device>"""
+
+        if self._store is None:
+            print("Хранилище не подключено (store_filename)")
+            return
+
+        command, *args = request_log
+        if command == "query" and len(args) == 3 and args[0].isnumeric():
+            seconds, device, sensor = args
+            since = time.time() - int(seconds)
+            for timestamp, source, value in self._store.query_range(
+                device, sensor, since
+            ):
+                print(f"{datetime.fromtimestamp(timestamp)} {source} {value}")
+
+        elif command == "dbfails" and len(args) == 1:
+            (device,) = args
+            errors, warnings = self._store.failure_counts(
+                device, self._start_datetime.timestamp()
+            )
+            print(f"Session errors: {errors} || Session warnings: {warnings}")
+
     def run(self):
         print(
             f"""
@@ -160,18 +551,44 @@ class GroundLogSystem:
 Пример: 5 3 temperature
 \n[printfails] <device> (Подсчитать количество ошибок и предупреждений)
 Пример: 3
+\n[query] <interval> <device> <sensor> (Записи из хранилища за последние interval секунд)
+Пример: query 60 3 temperature
+\n[dbfails] <device> (Ошибки и предупреждения сессии по хранилищу)
+Пример: dbfails 3
+\n[stats] <device> <sensor> (Скользящие агрегаты пары: count, min, max, mean, last, доля отказов)
+Пример: stats 3 temperature
 """
         )
 
-        self._last_request_time = time.time()
-        self._start_datetime = datetime.now()
+        if self._session_start is None:
+            self._start_datetime = datetime.now()
+        else:
+            # продолжение сессии после перезапуска
+            self._rebuild_failure_counts()
+        self._start_metrics()
         self._handle_telemetry_thr.start()
 
-        while 1:
-            request_log = input().split(" ")
-            self._handle_request(request_log)
+        try:
+            while 1:
+                request_log = input().split(" ")
+                self._handle_request(request_log)
+        finally:
+            self.close()
 
-    def _send_log_request(self, interval: int, device: int, sensor: str):
+    def close(self):
+        """Сбрасывает буферизованные записи лога и хранилища и закрывает их"""
+
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+
+        self._log_writer.close()
+        if self._store is not None:
+            self._store.close()
+
+    def _send_log_request(
+        self, interval: int, device: int, sensor: str, request_id: int | None = None
+    ):
         """Отправка запроса логов с параметрами через UDP"""
 
         message = {
@@ -180,6 +597,8 @@ class GroundLogSystem:
             "device": device,
             "sensor": sensor,
         }
+        if request_id is not None:
+            message["request_id"] = request_id
         self._udp_sock.sendto(
             json.dumps(message).encode(), (self.sls_ip, self.sls_port)
         )
@@ -190,39 +609,73 @@ class GroundLogSystem:
             interval=message["interval"],
             device=message["device"],
             sensor=message["sensor"],
+            request_id=request_id,
         )
 
+    def _send_resend(self, request_id: int | None, ranges):
+        """Запрос повторной отправки пропущенных seq потока (request_id None - живая телеметрия)"""
+
+        message = {"command": "resend", "ranges": ranges}
+        if request_id is not None:
+            message["request_id"] = request_id
+        self._udp_sock.sendto(
+            json.dumps(message).encode(), (self.sls_ip, self.sls_port)
+        )
+
+        print(f"Resend requested for stream {request_id or 'live'}: {ranges}")
+
+    def _count_failure(self, device: str, value: str, dtm: datetime):
+        value = value.lower()
+        if "error" in value:
+            kind = 0
+        elif "warning" in value:
+            kind = 1
+        else:
+            return
+
+        if dtm <= self._start_datetime:
+            return
+
+        with self._failure_counts_lock:
+            counts = self._failure_counts.setdefault(device, [0, 0])
+            counts[kind] += 1
+
+    def _rebuild_failure_counts(self):
+        """Восстанавливает счетчики отказов сессии по client.log (например после перезапуска).
+
+        Отказы сессии записаны по времени записи после начала сессии, значит
+        и приняты после него: читается только хвост лога, принятый после начала
+        сессии, его начало ищется бинарным поиском по времени приема rt.
+        Строки без rt (записанные до его появления) считаются принятыми раньше.
+        """
+
+        with self._failure_counts_lock:
+            self._failure_counts.clear()
+
+        self._log_writer.flush()
+        for newline in iter_log_since(
+            self.log_filename,
+            self._start_datetime.timestamp(),
+            line_timestamp=self._received_timestamp,
+        ):
+            # строки без отказов не разбираем
+            lowered = newline.lower()
+            if "error" not in lowered and "warning" not in lowered:
+                continue
+
+            log = dict(field.split("=", 1) for field in newline.split() if "=" in field)
+            if not {"device", "val", "dt", "tm"} <= log.keys():
+                continue
+
+            try:
+                dtm = datetime.fromisoformat(log["dt"] + "T" + log["tm"])
+            except ValueError:
+                continue
+            self._count_failure(log["device"], log["val"], dtm)
+
     def _get_failure_count(self, device):
-        errors = 0
-        warnings = 0
-
-        with open(self.log_filename, "r") as file:
-            eof = False
-
-            while not eof:
-                newline = file.readline().strip()
-
-                if not newline:
-                    eof = True
-                    break
-
-                log = {
-                    line.split("=")[0]: line.split("=")[1]
-                    for line in newline.split(" ")
-                }
-                if (
-                    log.get("device") is not None
-                    and log.get("device") == device
-                    and log.get("val") is not None
-                    and log.get("dt") is not None
-                    and log.get("tm") is not None
-                    and datetime.fromisoformat(log.get("dt") + "T" + log.get("tm"))
-                    > self._start_datetime
-                ):
-                    if "error" in log.get("val").lower():
-                        errors += 1
-                    elif "warning" in log.get("val").lower():
-                        warnings += 1
+        with self._failure_counts_lock:
+            errors, warnings = self._failure_counts.get(str(device), (0, 0))
 
         return errors, warnings
 
@@ -0,0 +1,140 @@
+import threading as thr
+
+from collections import deque
+
+LIVE = 0
+REPLAY = 1
+
+POLICIES = ("drop-oldest", "block", "pause-replay")
+
+
+class DownlinkQueue:
+    def __init__(self, maxlen=10000, policy="pause-replay"):
+        """Ограниченная очередь отправки с двумя классами приоритета.
+
+        Живая телеметрия (LIVE) всегда отправляется раньше повтора лога
+        (REPLAY). Поведение при заполнении задается policy:
+            drop-oldest  - вытесняется самое старое сообщение, сначала из REPLAY
+            block        - производитель ждет пока освободится место
+            pause-replay - REPLAY ждет, LIVE вытесняет самое старое сообщение
+        """
+
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+
+        self.maxlen = int(maxlen)
+        self.policy = policy
+
+        self._queues = (deque(), deque())
+        self._cond = thr.Condition()
+
+        # счетчики для каждого класса приоритета
+        self.dropped = [0, 0]
+        self.max_depth = 0
+
+        # вызывается без блокировки, когда в пустую очередь добавлены сообщения
+        self._on_ready = None
+
+    def __len__(self):
+        return len(self._queues[LIVE]) + len(self._queues[REPLAY])
+
+    def _is_full(self) -> bool:
+        return len(self) >= self.maxlen
+
+    def _drop_oldest(self):
+        priority = REPLAY if self._queues[REPLAY] else LIVE
+        self._queues[priority].popleft()
+        self.dropped[priority] += 1
+
+    def set_on_ready(self, callback):
+        """Уведомление о сообщениях для потребителей вне потоков (например asyncio).
+
+        callback вызывается в потоке производителя, поэтому должен только
+        передавать сигнал (loop.call_soon_threadsafe), None - отключить.
+        """
+
+        self._on_ready = callback
+
+    def put(self, msg, priority=LIVE, timeout=None, cancel=None) -> bool:
+        """Добавляет сообщение, возвращает False если оно было отброшено"""
+
+        return self.put_many((msg,), priority, timeout, cancel) == 1
+
+    def put_many(self, msgs, priority=LIVE, timeout=None, cancel=None) -> int:
+        """Добавляет сообщения, возвращает сколько из них попало в очередь.
+
+        Ожидание места прерывается, если установлен флаг cancel
+        (после установки флага нужно вызвать interrupt()).
+        """
+
+        wait = self.policy == "block" or (
+            self.policy == "pause-replay" and priority == REPLAY
+        )
+
+        added = 0
+        with self._cond:
+            # пока производитель ждал места, очередь могла опустеть
+            became_ready = False
+            for msg in msgs:
+                if self._is_full():
+                    if not wait:
+                        self._drop_oldest()
+                    elif not self._cond.wait_for(
+                        lambda: not self._is_full()
+                        or (cancel is not None and cancel.is_set()),
+                        timeout,
+                    ):
+                        self.dropped[priority] += 1
+                        continue
+
+                if cancel is not None and cancel.is_set():
+                    break
+
+                became_ready = became_ready or not len(self)
+                self._queues[priority].append(msg)
+                added += 1
+                self.max_depth = max(self.max_depth, len(self))
+                self._cond.notify_all()
+
+        on_ready = self._on_ready
+        if became_ready and on_ready is not None:
+            on_ready()
+
+        return added
+
+    def interrupt(self):
+        """Будит производителей, ожидающих места, чтобы они проверили флаг отмены"""
+
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait(self, timeout=None) -> bool:
+        """Ждет появления сообщений в очереди"""
+
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self) > 0, timeout)
+
+    def drain(self, max_items=None) -> list:
+        """Забирает сообщения из очереди: сначала LIVE, затем REPLAY"""
+
+        msgs = []
+        with self._cond:
+            for queue in self._queues:
+                while queue and (max_items is None or len(msgs) < max_items):
+                    msgs.append(queue.popleft())
+
+            if msgs:
+                # освободилось место для ожидающих производителей
+                self._cond.notify_all()
+
+        return msgs
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "depth_live": len(self._queues[LIVE]),
+                "depth_replay": len(self._queues[REPLAY]),
+                "max_depth": self.max_depth,
+                "dropped_live": self.dropped[LIVE],
+                "dropped_replay": self.dropped[REPLAY],
+            }
@@ -0,0 +1,285 @@
+import os
+import queue
+import selectors
+import socket
+import multiprocessing as mp
+
+from client import GroundLogSystem
+from tools import DEFAULT_MTU
+from udp_io import DatagramReceiver
+
+
+def _spacecraft_filename(filename, address) -> str:
+    ip, port = address
+    return f"{filename}.{ip}_{port}"
+
+
+def parse_address(value: str) -> tuple[str, int] | None:
+    """Разбирает адрес космического аппарата вида <ip>:<port>"""
+
+    ip, _, port = value.rpartition(":")
+    if not ip or not port.isnumeric():
+        return None
+    return ip, int(port)
+
+
+class GroundWorker:
+    def __init__(
+        self,
+        index,
+        gs_ip,
+        gs_port,
+        commands,
+        seen,
+        log_filename="client.log",
+        store_filename=None,
+        mtu=DEFAULT_MTU,
+        rcvbuf=1 << 20,
+        **kwargs,
+    ):
+        """Процесс пула наземной станции.
+
+        Сокет привязан к общему порту с SO_REUSEPORT, ядро распределяет
+        датаграммы между процессами по адресу отправителя, поэтому все
+        сообщения одного космического аппарата приходят в один процесс.
+        Для каждого аппарата заводится свой GroundLogSystem со своими логом,
+        хранилищем, счетчиками отказов и запросами getlog; о новых адресах
+        процесс сообщает координатору через очередь seen. Команды консоли
+        приходят по каналу commands парами (адрес, команда), None - выход.
+        """
+
+        self.index = index
+        self.gs_ip = gs_ip
+        self.gs_port = int(gs_port)
+        self.log_filename = log_filename
+        self.store_filename = store_filename
+        self.mtu = int(mtu)
+
+        self._commands = commands
+        self._seen = seen
+        # остальные параметры передаются в GroundLogSystem каждого аппарата
+        self._kwargs = kwargs
+
+        self._udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self._udp_sock.bind((self.gs_ip, self.gs_port))
+        self._udp_sock.setblocking(False)
+
+        self._receiver = DatagramReceiver(self._udp_sock, self.mtu, rcvbuf=rcvbuf)
+        self._kernel_dropped = 0
+
+        # адрес космического аппарата -> его GroundLogSystem
+        self._spacecraft = {}
+
+    def _get_spacecraft(self, address) -> GroundLogSystem:
+        ground = self._spacecraft.get(address)
+        if ground is not None:
+            return ground
+
+        ip, port = address
+        ground = GroundLogSystem(
+            self.gs_ip,
+            self.gs_port,
+            ip,
+            port,
+            log_filename=_spacecraft_filename(self.log_filename, address),
+            mtu=self.mtu,
+            store_filename=self.store_filename
+            and _spacecraft_filename(self.store_filename, address),
+            sock=self._udp_sock,
+            **self._kwargs,
+        )
+        ground._start_timers()
+
+        self._spacecraft[address] = ground
+        self._seen.put((address, self.index))
+        return ground
+
+    def _drain_msgs(self):
+        while True:
+            datagrams = self._receiver.drain()
+            for data, address in zip(datagrams, self._receiver.addresses):
+                ground = self._get_spacecraft(address)
+                for msg in ground._parse_datagram(data):
+                    ground._receive_msg(msg)
+
+            if len(datagrams) < self._receiver.buffer_count:
+                break
+
+        dropped = self._receiver.kernel_dropped
+        if dropped is not None and dropped > self._kernel_dropped:
+            lost = dropped - self._kernel_dropped
+            print(f"Worker {self.index}: kernel dropped {lost} datagrams")
+            self._kernel_dropped = dropped
+
+    def _handle_command(self) -> bool:
+        try:
+            command = self._commands.recv()
+        except EOFError:
+            return False
+        if command is None:
+            return False
+
+        address, request_log = command
+        self._get_spacecraft(address)._handle_request(request_log)
+        return True
+
+    def run(self):
+        """Цикл приема процесса пула. Блокирующий вызов!"""
+
+        selector = selectors.DefaultSelector()
+        selector.register(self._udp_sock, selectors.EVENT_READ)
+        selector.register(self._commands, selectors.EVENT_READ)
+
+        try:
+            while 1:
+                # таймеры getlog и порядка сообщений у каждого аппарата свои
+                timeouts = [
+                    ground._scheduler.run(blocking=False)
+                    for ground in self._spacecraft.values()
+                ]
+                timeouts = [timeout for timeout in timeouts if timeout is not None]
+
+                for key, _ in selector.select(min(timeouts, default=None)):
+                    if key.fileobj is self._udp_sock:
+                        self._drain_msgs()
+                    elif not self._handle_command():
+                        return
+        finally:
+            self.close()
+
+    def close(self):
+        for ground in self._spacecraft.values():
+            ground.close()
+        self._udp_sock.close()
+
+
+def _run_worker(index, args, kwargs):
+    GroundWorker(index, *args, **kwargs).run()
+
+
+class GroundPool:
+    def __init__(self, gs_ip, gs_port, workers=None, **kwargs):
+        """Наземная станция для многих космических аппаратов.
+
+        Запускает workers процессов GroundWorker на одном порту (SO_REUSEPORT),
+        каждый сам разбирает, проверяет и сохраняет телеметрию своих аппаратов.
+        Координатор читает консоль и отправляет команду процессу, который
+        принимает телеметрию аппарата с указанным адресом. Остальные параметры
+        передаются в GroundWorker и GroundLogSystem каждого аппарата.
+        """
+
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+
+        self.gs_ip = str(gs_ip).strip()
+        self.gs_port = int(gs_port)
+        self.workers = int(workers or os.cpu_count() or 1)
+        self._kwargs = kwargs
+
+        self._seen = mp.Queue()
+        self._processes = []
+        self._commands = []
+
+        # адрес космического аппарата -> номер процесса, который его принимает
+        self._routes = {}
+
+    def start(self):
+        for index in range(self.workers):
+            commands, worker_commands = mp.Pipe()
+            process = mp.Process(
+                target=_run_worker,
+                args=(
+                    index,
+                    (self.gs_ip, self.gs_port, worker_commands, self._seen),
+                    self._kwargs,
+                ),
+            )
+            process.daemon = True
+            process.start()
+
+            self._processes.append(process)
+            self._commands.append(commands)
+
+    def spacecraft(self) -> dict:
+        """Известные адреса космических аппаратов и номера их процессов"""
+
+        while True:
+            try:
+                address, index = self._seen.get_nowait()
+            except queue.Empty:
+                break
+            self._routes[tuple(address)] = index
+
+        return dict(self._routes)
+
+    def route(self, request_log) -> bool:
+        """Команда "<ip>:<port> <команда GroundLogSystem>".
+
+        Если известен только один аппарат, адрес можно не указывать.
+        """
+
+        routes = self.spacecraft()
+        address = parse_address(request_log[0]) if request_log else None
+        if address is not None:
+            request_log = request_log[1:]
+        elif len(routes) == 1:
+            (address,) = routes
+        else:
+            print("Укажите адрес космического аппарата: <ip>:<port> <команда>")
+            return False
+
+        index = routes.get(address)
+        if index is None or not request_log:
+            print(f"Телеметрия от {address[0]}:{address[1]} еще не принималась")
+            return False
+
+        self._commands[index].send((address, request_log))
+        return True
+
+    def run(self):
+        print(
+            f"""
+Сокет наземной станции: {self.gs_ip}:{self.gs_port} ({self.workers} процессов)
+\nКоманды GroundLogSystem с адресом космического аппарата впереди:
+<ip>:<port> <команда>
+Пример: 127.0.0.1:5002 5 3 temperature
+\n[list] (Известные космические аппараты)
+"""
+        )
+
+        self.start()
+        try:
+            while 1:
+                request_log = input().split(" ")
+                if request_log == ["list"]:
+                    for (ip, port), index in sorted(self.spacecraft().items()):
+                        print(f"{ip}:{port} (процесс {index})")
+                    continue
+
+                self.route(request_log)
+        finally:
+            self.close()
+
+    def close(self, timeout=5.0):
+        """Останавливает процессы, они сбрасывают логи и хранилища перед выходом"""
+
+        for commands in self._commands:
+            try:
+                commands.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+def main():
+    pool = GroundPool("127.0.0.1", 5001)
+    pool.run()
+
+
+if __name__ == "__main__":
+    main()
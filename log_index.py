@@ -0,0 +1,82 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+
+class LogIndex:
+    def __init__(self):
+        """Индекс бортового лога по ключу (device, sensor, timestamp).
+
+        Для каждой пары (device, sensor) хранятся отсортированные по времени
+        метки и смещения строк в файле, поэтому выборка за последние N секунд
+        стоит O(log n + k), где k - количество подходящих строк.
+        """
+
+        self._timestamps = defaultdict(list)
+        self._offsets = defaultdict(list)
+
+    @staticmethod
+    def parse_line(line: str):
+        """Возвращает (device, sensor, timestamp) для строки лога"""
+
+        dt, tm, _, device, sensor, _ = line.split(" ")
+        timestamp = datetime.fromisoformat(dt + "T" + tm).timestamp()
+        return device, sensor, timestamp
+
+    def add(self, device: str, sensor: str, timestamp: float, offset: int):
+        key = (str(device), str(sensor))
+        timestamps = self._timestamps[key]
+        offsets = self._offsets[key]
+
+        # лог пишется по времени, поэтому почти всегда это просто append
+        if not timestamps or timestamps[-1] <= timestamp:
+            timestamps.append(timestamp)
+            offsets.append(offset)
+            return
+
+        pos = bisect_left(timestamps, timestamp)
+        timestamps.insert(pos, timestamp)
+        offsets.insert(pos, offset)
+
+    def add_line(self, line: str, offset: int):
+        self.add(*self.parse_line(line), offset)
+
+    def find(self, device, sensor, since: float) -> list[int]:
+        """Смещения строк пары (device, sensor) с меткой времени больше since"""
+
+        key = (str(device), str(sensor))
+        timestamps = self._timestamps.get(key)
+        if not timestamps:
+            return []
+
+        pos = bisect_left(timestamps, since)
+        while pos < len(timestamps) and timestamps[pos] <= since:
+            pos += 1
+        return self._offsets[key][pos:]
+
+    def clear(self):
+        self._timestamps.clear()
+        self._offsets.clear()
+
+    @classmethod
+    def from_file(cls, filename: str) -> "LogIndex":
+        """Строит индекс по уже существующему файлу лога (один проход при старте)"""
+
+        index = cls()
+        try:
+            file = open(filename, "rb")
+        except FileNotFoundError:
+            return index
+
+        with file:
+            offset = 0
+            for raw in file:
+                line = raw.decode().strip()
+                if line:
+                    try:
+                        index.add_line(line, offset)
+                    except ValueError:
+                        pass
+                offset += len(raw)
+
+        return index
@@ -0,0 +1,100 @@
+import mmap
+
+from datetime import datetime
+
+
+def _line_timestamp(line: bytes) -> float | None:
+    try:
+        dt, tm, _ = line.split(b" ", 2)
+        return datetime.fromisoformat((dt + b"T" + tm).decode()).timestamp()
+    except ValueError:
+        return None
+
+
+def _find_first_after(mm, since: float, line_timestamp=_line_timestamp) -> int:
+    """Бинарный поиск начала первой строки с меткой времени больше since.
+
+    line_timestamp достает метку из строки (bytes), строки без метки
+    (None) считаются записанными до since.
+    """
+
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = mm.rfind(b"\n", 0, mid) + 1
+        end = mm.find(b"\n", start)
+        if end == -1:
+            end = len(mm)
+
+        timestamp = line_timestamp(mm[start:end])
+        if timestamp is None or timestamp <= since:
+            lo = end + 1
+        else:
+            hi = start
+
+    return lo
+
+
+def _open_mmap(filename: str):
+    try:
+        file = open(filename, "rb")
+    except FileNotFoundError:
+        return None
+
+    with file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # пустой файл нельзя отобразить в память
+            return None
+
+
+def find_offset_since(filename: str, since: float) -> int:
+    """Смещение первой строки лога с меткой времени больше since"""
+
+    mm = _open_mmap(filename)
+    if mm is None:
+        return 0
+
+    with mm:
+        return _find_first_after(mm, since)
+
+
+def iter_log_since(
+    filename: str, since: float, start=0, stop=None, line_timestamp=_line_timestamp
+):
+    """Читает из лога только хвост, записанный после since.
+
+    Лог дописывается в конец и упорядочен по времени, поэтому начало
+    интервала ищется бинарным поиском по отображенному в память файлу,
+    а дальше читаются только подходящие строки.
+
+    start и stop ограничивают чтение строками, которые начинаются
+    в байтах [start, stop) файла, чтобы файл можно было читать по частям.
+    line_timestamp задает, откуда в строке берется метка времени
+    (по умолчанию - дата и время в начале строки бортового лога).
+    """
+
+    mm = _open_mmap(filename)
+    if mm is None:
+        return
+
+    with mm:
+        pos = _find_first_after(mm, since, line_timestamp)
+        if start > pos:
+            # строка, начатая до start, относится к предыдущей части
+            if mm[start - 1 : start] == b"\n":
+                pos = start
+            else:
+                pos = mm.find(b"\n", start) + 1 or len(mm)
+
+        size = len(mm) if stop is None else min(stop, len(mm))
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                end = len(mm)
+
+            line = mm[pos:end].decode().strip()
+            if line:
+                yield line
+            pos = end + 1
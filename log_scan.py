@@ -0,0 +1,86 @@
+import heapq
+import os
+
+from datetime import datetime
+
+import binary_log
+import log_reader
+
+
+def iter_file_lines(
+    filename, log_format, since: datetime, device, sensor, start=0, stop=None
+):
+    """Строки пары (device, sensor) из файла лога без индекса, записанные после since.
+
+    start и stop ограничивают чтение частью файла в байтах [start, stop).
+    """
+
+    if log_format == "binary":
+        yield from binary_log.iter_binary_log_since(
+            filename, binary_log.to_epoch_us(since), device, sensor, start, stop
+        )
+        return
+
+    device, sensor = str(device), str(sensor)
+    for newline in log_reader.iter_log_since(filename, since.timestamp(), start, stop):
+        fields = newline.split(" ")
+        if fields[3] == device and fields[4] == sensor:
+            yield newline
+
+
+def scan_part(filename, log_format, since: datetime, device, sensor, start, stop):
+    """Задача для пула процессов: строки пары из части файла одним списком"""
+
+    lines = iter_file_lines(filename, log_format, since, device, sensor, start, stop)
+    return list(lines)
+
+
+def plan_scan(filenames, log_format, since: datetime) -> list[tuple[str, int, int]]:
+    """Хвосты файлов после since: (файл, начало, конец) в байтах"""
+
+    plan = []
+    for filename in filenames:
+        try:
+            size = os.path.getsize(filename)
+        except FileNotFoundError:
+            continue
+
+        if log_format == "binary":
+            since_us = binary_log.to_epoch_us(since)
+            start = binary_log.find_offset_since(filename, since_us)
+        else:
+            start = log_reader.find_offset_since(filename, since.timestamp())
+        if start < size:
+            plan.append((filename, start, size))
+
+    return plan
+
+
+def split_plan(plan, parts: int, log_format) -> list[tuple[str, int, int]]:
+    """Делит хвосты на части примерно по 1/parts общего объема.
+
+    Записи бинарного лога не разрезаются, строки текстового лога
+    дочитываются той частью, в которой начались.
+    """
+
+    total = sum(stop - start for _, start, stop in plan)
+    part_size = max(-(-total // max(parts, 1)), 1)
+    if log_format == "binary":
+        part_size = -(-part_size // binary_log.RECORD.size) * binary_log.RECORD.size
+
+    split = []
+    for filename, start, stop in plan:
+        for part_start in range(start, stop, part_size):
+            split.append((filename, part_start, min(part_start + part_size, stop)))
+    return split
+
+
+def _line_time(line: str):
+    # дата и время в начале строки сравниваются как строки ISO формата
+    return line.split(" ", 2)[:2]
+
+
+def merge_lines(results):
+    """Сливает упорядоченные по времени списки строк в один поток по времени"""
+
+    return heapq.merge(*results, key=_line_time)
@@ -0,0 +1,147 @@
+import json
+import os
+import threading as thr
+
+
+class SegmentManifest:
+    def __init__(self, log_filename: str, sidecars=()):
+        """Манифест сегментов бортового лога.
+
+        Текущий файл лога - активный сегмент. При ротации он закрывается,
+        и в <log_filename>.manifest дописывается строка JSON с именем файла,
+        временем первой и последней записи и парами (device, sensor).
+        getlog открывает только сегменты, которые пересекаются с интервалом
+        и содержат нужную пару; хранение ограничивается удалением сегментов
+        целиком вместе с файлами <сегмент><sidecar> (например ".strings").
+        """
+
+        self.filename = log_filename + ".manifest"
+        self.sidecars = tuple(sidecars)
+
+        self._lock = thr.Lock()
+        self._segments = []
+        self._load()
+
+        # записи, сделанные до запуска, неизвестны: непустой текущий файл
+        # считается содержащим любые пары за любое время
+        try:
+            unknown = os.path.getsize(log_filename) > 0
+        except FileNotFoundError:
+            unknown = False
+        self._reset_active(unknown)
+
+    def _load(self):
+        try:
+            file = open(self.filename, "r")
+        except FileNotFoundError:
+            return
+
+        with file:
+            for line in file:
+                try:
+                    segment = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if os.path.exists(segment["filename"]):
+                    self._segments.append(self._from_json(segment))
+
+    @staticmethod
+    def _from_json(segment: dict) -> dict:
+        pairs = segment["pairs"]
+        if pairs is not None:
+            pairs = {tuple(pair) for pair in pairs}
+        return {**segment, "pairs": pairs}
+
+    @staticmethod
+    def _to_json(segment: dict) -> str:
+        pairs = segment["pairs"]
+        if pairs is not None:
+            pairs = sorted(pairs)
+        return json.dumps({**segment, "pairs": pairs})
+
+    def _reset_active(self, unknown=False):
+        self._start = None
+        self._end = None
+        self._pairs = None if unknown else set()
+
+    def add(self, device, sensor, timestamp: float):
+        """Учитывает запись в активном сегменте"""
+
+        with self._lock:
+            if self._pairs is None:
+                return
+
+            if self._start is None or timestamp < self._start:
+                self._start = timestamp
+            if self._end is None or timestamp > self._end:
+                self._end = timestamp
+            self._pairs.add((str(device), str(sensor)))
+
+    def close_segment(self, filename: str):
+        """Активный сегмент переименован в filename при ротации"""
+
+        with self._lock:
+            segment = {
+                "filename": filename,
+                "start": self._start,
+                "end": self._end,
+                "pairs": self._pairs,
+            }
+            if self._pairs is None:
+                # записи до запуска: конец сегмента - время последнего изменения файла
+                segment["end"] = os.path.getmtime(filename)
+            self._segments.append(segment)
+            self._reset_active()
+
+            with open(self.filename, "a") as file:
+                file.write(self._to_json(segment) + "\n")
+
+    def find(self, device, sensor, since: float, until: float | None = None):
+        """Закрытые сегменты, где могут быть записи пары после since (и до until)"""
+
+        key = (str(device), str(sensor))
+        with self._lock:
+            return [
+                segment["filename"]
+                for segment in self._segments
+                if self._overlaps(segment, since, until)
+                and (segment["pairs"] is None or key in segment["pairs"])
+            ]
+
+    @staticmethod
+    def _overlaps(segment: dict, since: float, until: float | None) -> bool:
+        if segment["end"] is not None and segment["end"] <= since:
+            return False
+        if until is not None and segment["start"] is not None:
+            return segment["start"] <= until
+        return True
+
+    def expire(self, before: float) -> list[str]:
+        """Удаляет сегменты, все записи которых старше before"""
+
+        with self._lock:
+            kept, expired = [], []
+            for segment in self._segments:
+                if segment["end"] is not None and segment["end"] < before:
+                    expired.append(segment)
+                else:
+                    kept.append(segment)
+            if not expired:
+                return []
+
+            self._segments = kept
+
+            tmp_filename = self.filename + ".tmp"
+            with open(tmp_filename, "w") as file:
+                for segment in self._segments:
+                    file.write(self._to_json(segment) + "\n")
+            os.replace(tmp_filename, self.filename)
+
+        for segment in expired:
+            for suffix in ("", *self.sidecars):
+                try:
+                    os.remove(segment["filename"] + suffix)
+                except FileNotFoundError:
+                    pass
+
+        return [segment["filename"] for segment in expired]
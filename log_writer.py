@@ -0,0 +1,144 @@
+import os
+import time
+import threading as thr
+
+from datetime import datetime
+
+
+class LogWriter:
+    def __init__(
+        self,
+        filename,
+        buffer_size=64 * 1024,
+        flush_interval=1.0,
+        max_bytes=0,
+        rotate_interval=0,
+        fsync=False,
+        on_rotate=None,
+    ):
+        """Буферизованная запись лога в постоянно открытый файл.
+
+        Записи копятся в памяти и сбрасываются одной операцией, когда буфер
+        превышает buffer_size байт или с прошлого сброса прошло flush_interval
+        секунд (проверяется при записи и фоновым потоком, поэтому записи не
+        застревают в буфере, когда запись прекратилась). Перед чтением лога
+        нужно вызвать flush(), перед выходом - close().
+
+        Ротация включается max_bytes (по размеру) и/или rotate_interval
+        (по времени, в секундах): текущий файл переименовывается в
+        <filename>.<время ротации>, а запись продолжается в новый файл.
+        """
+
+        self.filename = filename
+        self.buffer_size = int(buffer_size)
+        self.flush_interval = float(flush_interval)
+        self.max_bytes = int(max_bytes)
+        self.rotate_interval = float(rotate_interval)
+        self.fsync = fsync
+        self.on_rotate = on_rotate
+
+        self._lock = thr.Lock()
+        self._buffer = []
+        self._buffered = 0
+        self._open()
+
+        self._closed = thr.Event()
+        if self.flush_interval > 0:
+            self._flusher_thr = thr.Thread(target=self._flush_loop)
+            self._flusher_thr.daemon = True
+            self._flusher_thr.start()
+
+    def _open(self):
+        self._file = open(self.filename, "ab")
+        # смещение конца файла с учетом еще не сброшенного буфера
+        self._position = self._file.tell()
+        self._opened_at = time.time()
+        self._last_flush = time.monotonic()
+
+    def _need_rotate(self) -> bool:
+        if self.max_bytes and self._position >= self.max_bytes:
+            return True
+        if self.rotate_interval and time.time() - self._opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    def _flush(self):
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._closed.is_set():
+                    return
+                if (
+                    self._buffer
+                    and time.monotonic() - self._last_flush >= self.flush_interval
+                ):
+                    self._flush()
+
+    def _rotate(self) -> str:
+        self._flush()
+        self._file.close()
+
+        rotated = f"{self.filename}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.rename(self.filename, rotated)
+        self._open()
+        return rotated
+
+    def write(self, record) -> int:
+        """Добавляет запись (строку без перевода строки или готовые байты).
+
+        Возвращает смещение записи в текущем файле лога.
+        """
+
+        if isinstance(record, str):
+            record = (record + "\n").encode()
+
+        rotated = None
+        with self._lock:
+            if self._need_rotate():
+                rotated = self._rotate()
+
+            offset = self._position
+            self._buffer.append(record)
+            self._buffered += len(record)
+            self._position += len(record)
+
+            if (
+                self._buffered >= self.buffer_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush()
+
+        if rotated and self.on_rotate:
+            self.on_rotate(rotated)
+
+        return offset
+
+    def flush(self) -> int:
+        """Сбрасывает буфер в файл, после этого записи видны при чтении лога.
+
+        Возвращает размер файла на момент сброса: записи с меньшими смещениями
+        гарантированно лежат в файле целиком.
+        """
+
+        with self._lock:
+            self._flush()
+            return self._position
+
+    def close(self):
+        with self._lock:
+            if self._closed.is_set():
+                return
+
+            self._closed.set()
+            self._flush()
+            self._file.close()
@@ -1,9 +1,32 @@
 from collections import namedtuple
 
+# request_id - идентификатор запроса getlog, к которому относится сообщение повтора,
+# seq - номер сообщения в его потоке (живая телеметрия или повтор request_id)
 Message = namedtuple(
-    "Message", ("date", "time", "source", "device", "sensor", "value", "checksum")
+    "Message",
+    (
+        "date",
+        "time",
+        "source",
+        "device",
+        "sensor",
+        "value",
+        "checksum",
+        "request_id",
+        "seq",
+    ),
+    defaults=(None, None),
 )
 
+# количество полей в строке сообщения "<date> <time> ... <checksum>"
+MESSAGE_FIELDS = 7
+
 RequestMessage = namedtuple(
-    "RequestMessage", ("command", "interval", "device", "sensor")
+    "RequestMessage",
+    ("command", "interval", "device", "sensor", "request_id"),
+    defaults=(None,),
 )
+
+# повторная отправка сообщений потока request_id (None - живая телеметрия),
+# ranges - пары (первый seq, последний seq или None - до конца)
+ResendMessage = namedtuple("ResendMessage", ("command", "request_id", "ranges"))
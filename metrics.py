@@ -0,0 +1,201 @@
+import threading as thr
+
+from array import array
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# границы интервалов гистограмм длительности по умолчанию, сек
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help="", function=None):
+        """Монотонно растущее значение.
+
+        С function оно при экспорте берется из уже существующего счетчика
+        (например DownlinkQueue.dropped), inc не используется.
+        """
+
+        self.name = name
+        self.help = help
+        self._function = function
+        self._value = 0
+        self._lock = thr.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._function() if self._function is not None else self._value
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name, help="", function=None):
+        """Текущее значение; с function оно считывается только при экспорте"""
+
+        self.name = name
+        self.help = help
+        self._function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self._function() if self._function is not None else self._value
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        """Гистограмма с фиксированными границами интервалов.
+
+        Наблюдение увеличивает один счетчик интервала, накопленные
+        значения bucket{le=...} считаются только при экспорте.
+        """
+
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets))
+
+        # последний счетчик - значения больше всех границ (+Inf)
+        self._counts = array("q", [0]) * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = thr.Lock()
+
+    def observe(self, value: float):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[slot] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def samples(self):
+        with self._lock:
+            counts = self._counts.tolist()
+            total = self._sum
+
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{_format_value(bound)}"}}', cumulative
+        yield f"{self.name}_sum", total
+        yield f"{self.name}_count", cumulative
+
+
+class MetricsRegistry:
+    def __init__(self, prefix=""):
+        """Реестр метрик процесса: счетчики, измерители и гистограммы.
+
+        Обновление метрики - одна операция под своей блокировкой, текст
+        в формате экспозиции Prometheus собирается только по запросу.
+        """
+
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = thr.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help="", function=None) -> Counter:
+        return self._register(Counter(self.prefix + name, help, function))
+
+    def gauge(self, name, help="", function=None) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help, function))
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help, buckets))
+
+    def get(self, name):
+        return self._metrics.get(self.prefix + name)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате экспозиции Prometheus"""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # запросы сборщика метрик не засоряют вывод консоли
+        pass
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry, host="127.0.0.1", port=0):
+        """Локальный HTTP сервер, отдающий метрики реестра на GET /metrics.
+
+        port=0 - свободный порт, выбранный системой (см. address).
+        """
+
+        self._server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.registry = registry
+
+        self._thr = thr.Thread(target=self._server.serve_forever)
+        self._thr.daemon = True
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thr.start()
+        return self
+
+    def close(self):
+        if self._thr.is_alive():
+            self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,133 @@
+import math
+import threading as thr
+
+from array import array
+
+
+class RollingWindow:
+    def __init__(self, window: float, buckets=60):
+        """Агрегаты одной пары (device, sensor) за последние window секунд.
+
+        Окно разбито на buckets интервалов в кольцевых массивах, запись
+        обновляет один интервал за O(1), устаревший интервал обнуляется
+        при повторном использовании ячейки.
+        """
+
+        self.window = float(window)
+        self.buckets = int(buckets)
+        self.resolution = self.window / self.buckets
+
+        # номер интервала, к которому относится ячейка (-1 - пустая)
+        self._starts = array("q", [-1]) * self.buckets
+        self._counts = array("q", [0]) * self.buckets
+        self._failures = array("q", [0]) * self.buckets
+        self._values = array("q", [0]) * self.buckets
+        self._sums = array("d", [0.0]) * self.buckets
+        self._mins = array("d", [math.inf]) * self.buckets
+        self._maxs = array("d", [-math.inf]) * self.buckets
+
+    def add(self, timestamp: float, value: float | None, failure: bool):
+        index = int(timestamp // self.resolution)
+        slot = index % self.buckets
+        if self._starts[slot] != index:
+            if self._starts[slot] > index:
+                # запись старше окна, ячейка уже занята более новым интервалом
+                return
+
+            self._starts[slot] = index
+            self._counts[slot] = 0
+            self._failures[slot] = 0
+            self._values[slot] = 0
+            self._sums[slot] = 0.0
+            self._mins[slot] = math.inf
+            self._maxs[slot] = -math.inf
+
+        self._counts[slot] += 1
+        if failure:
+            self._failures[slot] += 1
+        if value is not None:
+            self._values[slot] += 1
+            self._sums[slot] += value
+            self._mins[slot] = min(self._mins[slot], value)
+            self._maxs[slot] = max(self._maxs[slot], value)
+
+    def summary(self, now: float) -> dict:
+        oldest = int(now // self.resolution) - self.buckets + 1
+
+        count = failures = values = 0
+        total = 0.0
+        minimum, maximum = math.inf, -math.inf
+        for slot in range(self.buckets):
+            if self._starts[slot] < oldest:
+                continue
+
+            count += self._counts[slot]
+            failures += self._failures[slot]
+            values += self._values[slot]
+            total += self._sums[slot]
+            minimum = min(minimum, self._mins[slot])
+            maximum = max(maximum, self._maxs[slot])
+
+        return {
+            "count": count,
+            "min": minimum if values else None,
+            "max": maximum if values else None,
+            "mean": total / values if values else None,
+            "failure_rate": failures / count if count else None,
+        }
+
+
+class RollingStats:
+    def __init__(self, windows=(60, 300, 3600), buckets=60):
+        """Скользящие агрегаты пар (device, sensor) для нескольких окон.
+
+        Для каждого окна: количество, min, max, среднее, доля отказов;
+        последнее значение - по времени записи, а не по времени приема.
+        """
+
+        self.windows = tuple(float(window) for window in windows)
+        self.buckets = int(buckets)
+
+        self._lock = thr.Lock()
+        # (device, sensor) -> (окна, [время и значение последней записи])
+        self._pairs = {}
+
+    def add(self, device, sensor, timestamp: float, value: str, failure: bool):
+        """Отказы и нечисловые значения не входят в min, max и среднее"""
+
+        number = None
+        if not failure:
+            try:
+                number = float(value)
+            except ValueError:
+                pass
+
+        key = (str(device), str(sensor))
+        with self._lock:
+            pair = self._pairs.get(key)
+            if pair is None:
+                windows = [
+                    RollingWindow(window, self.buckets) for window in self.windows
+                ]
+                pair = self._pairs[key] = (windows, [-math.inf, None])
+
+            windows, last = pair
+            for window in windows:
+                window.add(timestamp, number, failure)
+            if timestamp >= last[0]:
+                last[:] = timestamp, value
+
+    def summary(self, device, sensor, now: float) -> dict | None:
+        """Агрегаты пары по окнам {window: {...}} или None, если пара не встречалась"""
+
+        with self._lock:
+            pair = self._pairs.get((str(device), str(sensor)))
+            if pair is None:
+                return None
+
+            windows, (_, last) = pair
+            summary = {}
+            for window in windows:
+                summary[window.window] = window.summary(now)
+                summary[window.window]["last"] = last
+            return summary
@@ -0,0 +1,167 @@
+import itertools
+import threading as thr
+
+from collections import OrderedDict, deque
+
+# поток живой телеметрии, повторы getlog нумеруются в потоке своего request_id
+LIVE_STREAM = 0
+
+
+class RetransmitBuffer:
+    def __init__(self, maxlen=1024, max_streams=64):
+        """Последние отправленные сообщения каждого потока для повторной отправки.
+
+        Хранится не больше maxlen сообщений на поток и не больше max_streams
+        потоков, самый старый поток вытесняется целиком.
+        """
+
+        self.maxlen = int(maxlen)
+        self.max_streams = int(max_streams)
+
+        self._lock = thr.Lock()
+        self._streams = OrderedDict()
+
+    def open(self, stream) -> deque:
+        """Начинает поток заново и возвращает его буфер.
+
+        Сообщения добавляются через add() в возвращенный буфер, поэтому
+        запоздавший повтор, который уже заменен новым, не попадет в буфер нового.
+        """
+
+        buffer = deque(maxlen=self.maxlen)
+        with self._lock:
+            self._streams.pop(stream, None)
+            self._streams[stream] = buffer
+            while len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        return buffer
+
+    def add(self, buffer: deque, msg: dict):
+        with self._lock:
+            buffer.append(msg)
+
+    def get(self, stream, first: int, last: int | None = None) -> list[dict]:
+        """Сообщения потока с seq от first до last включительно (None - до конца)"""
+
+        with self._lock:
+            buffer = self._streams.get(stream)
+            if not buffer:
+                return []
+
+            # seq в буфере идут подряд, поэтому диапазон находится по смещению
+            start = max(first - buffer[0]["seq"], 0)
+            stop = None if last is None else max(last - buffer[0]["seq"] + 1, 0)
+            return list(itertools.islice(buffer, start, stop))
+
+
+class SequenceTracker:
+    def __init__(self, next_seq=None, window=64, timeout=0.2, history=4096):
+        """Восстановление порядка сообщений одного потока по seq.
+
+        Сообщения выдаются строго по возрастанию seq, повторы отбрасываются.
+        Сообщения после пропуска ждут в окне переупорядочивания; если пропуск
+        не заполнился за timeout секунд или окно переполнено (больше window
+        сообщений), пропуск считается потерей: он возвращается для повторного
+        запроса, а запоздавшие сообщения из него принимаются вне очереди.
+
+        next_seq - ожидаемый первый seq (None - первый принятый), history -
+        сколько последних seq помнить пропущенными.
+        """
+
+        self.next_seq = next_seq
+        self.window = int(window)
+        self.timeout = float(timeout)
+        self.history = int(history)
+
+        self._pending = {}
+        self._pending_since = None
+        self._missing = set()
+
+        self.duplicates = 0
+        self.lost = 0
+
+    def push(self, seq: int, msg, now: float) -> tuple[list, list]:
+        """Принимает сообщение, возвращает (готовые сообщения, новые пропуски)"""
+
+        if self.next_seq is None:
+            self.next_seq = seq
+
+        if seq < self.next_seq:
+            if seq in self._missing:
+                self._missing.discard(seq)
+                self.lost -= 1
+                return [msg], []
+
+            if self.next_seq - seq <= self.history:
+                self.duplicates += 1
+                return [], []
+
+            # отправитель перезапущен и начал нумерацию заново
+            self.next_seq = seq
+            self._pending.clear()
+            self._pending_since = None
+            self._missing.clear()
+
+        if seq in self._pending:
+            self.duplicates += 1
+            return [], []
+
+        self._pending[seq] = msg
+        if self._pending_since is None:
+            self._pending_since = now
+
+        released = self._release()
+        gaps = []
+        while len(self._pending) > self.window:
+            gaps.append(self._skip_gap())
+            released.extend(self._release())
+
+        return released, gaps
+
+    def expire(self, now: float) -> tuple[list, list]:
+        """Считает потерянными пропуски старше timeout"""
+
+        released = []
+        gaps = []
+        if self._pending and now - self._pending_since >= self.timeout:
+            while self._pending:
+                gaps.append(self._skip_gap())
+                released.extend(self._release())
+
+        return released, gaps
+
+    def _release(self) -> list:
+        released = []
+        while self.next_seq in self._pending:
+            released.append(self._pending.pop(self.next_seq))
+            self.next_seq += 1
+
+        if not self._pending:
+            self._pending_since = None
+        return released
+
+    def _skip_gap(self) -> tuple[int, int]:
+        first = self.next_seq
+        last = min(self._pending) - 1
+        self._missing.update(range(first, last + 1))
+        self.lost += last - first + 1
+        self.next_seq = last + 1
+
+        if len(self._missing) > self.history:
+            horizon = self.next_seq - self.history
+            self._missing = {seq for seq in self._missing if seq >= horizon}
+        return first, last
+
+    def missing_ranges(self) -> list[tuple[int, int]]:
+        """Пропуски, которые еще ждут повторной отправки, диапазонами"""
+
+        ranges = []
+        for seq in sorted(self._missing):
+            if ranges and ranges[-1][1] == seq - 1:
+                ranges[-1] = (ranges[-1][0], seq)
+            else:
+                ranges.append((seq, seq))
+        return ranges
+
+    def has_missing(self) -> bool:
+        return bool(self._missing or self._pending)
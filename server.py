@@ -1,14 +1,33 @@
+import itertools
 import socket
 import time
 import json
 import random
 import threading as thr
-
-from collections import deque
-from datetime import datetime
-
-from message_types import RequestMessage
-from tools import calc_checksum
+import multiprocessing as mp
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from binary_log import StringTable, encode_record
+from downlink_queue import LIVE, REPLAY, DownlinkQueue
+from log_index import LogIndex
+from log_scan import iter_file_lines, merge_lines, plan_scan, scan_part, split_plan
+from log_segments import SegmentManifest
+from log_writer import LogWriter
+from message_types import RequestMessage, ResendMessage
+from metrics import MetricsRegistry, MetricsServer
+from sequencing import LIVE_STREAM, RetransmitBuffer
+from ticker import FixedRateTicker
+from tools import (
+    CHECKSUM_MODES,
+    DEFAULT_MTU,
+    calc_line_checksum,
+    make_checksum,
+    pack_datagrams,
+)
+from udp_io import DatagramReceiver
+from wire import pack_batch_datagrams, pack_binary_datagrams
 
 
 class SputnikLogSystem:
@@ -19,6 +38,25 @@ class SputnikLogSystem:
         sls_ip,
         sls_port,
         log_filename="server.log",
+        use_index=True,
+        mtu=DEFAULT_MTU,
+        log_flush_interval=1.0,
+        log_max_bytes=0,
+        log_rotate_interval=0,
+        log_retention=0,
+        log_format="text",
+        queue_maxlen=10000,
+        queue_policy="pause-replay",
+        replay_rate=0,
+        checksum_mode="sum",
+        wire_format="json",
+        retransmit_size=1024,
+        replay_encoding="plain",
+        scan_workers=0,
+        scan_threshold=16 << 20,
+        simulator=None,
+        tick=0.5,
+        metrics_port=None,
     ):
         """Класс для отправки логов, принятых от бортовой системы космического аппарата"""
 
@@ -28,6 +66,58 @@ class SputnikLogSystem:
         self.sls_port = int(sls_port)
 
         self.log_filename = log_filename
+        self.mtu = int(mtu)
+
+        # "sum" - аддитивная сумма байт, "crc32" - CRC32 (учитывает порядок байт)
+        if checksum_mode not in CHECKSUM_MODES:
+            raise ValueError(f"Unknown checksum mode: {checksum_mode}")
+        self.checksum_mode = checksum_mode
+
+        # формат датаграмм: "json" или компактный "binary" (wire.py),
+        # наземная станция определяет его по первому байту
+        if wire_format not in ("json", "binary"):
+            raise ValueError(f"Unknown wire format: {wire_format}")
+        self.wire_format = wire_format
+
+        # "plain" - записи повтора getlog как остальные сообщения, "zlib" -
+        # пачками по (device, sensor) со сжатием (wire.pack_batch_datagrams)
+        if replay_encoding not in ("plain", "zlib"):
+            raise ValueError(f"Unknown replay encoding: {replay_encoding}")
+        self.replay_encoding = replay_encoding
+
+        # "text" - строки через пробел, "binary" - записи фиксированной длины
+        if log_format not in ("text", "binary"):
+            raise ValueError(f"Unknown log format: {log_format}")
+        self.log_format = log_format
+        self._log_strings = (
+            StringTable(self.log_filename) if log_format == "binary" else None
+        )
+
+        # индекс (device, sensor, timestamp) -> смещение строки в логе,
+        # без индекса getlog читает только хвост лога бинарным поиском
+        # (бинарный лог ищется по номеру записи, индекс ему не нужен)
+        self._log_index = (
+            LogIndex.from_file(self.log_filename)
+            if use_index and log_format == "text"
+            else None
+        )
+
+        # ротация по log_rotate_interval / log_max_bytes делит лог на сегменты,
+        # getlog читает только сегменты из манифеста, пересекающиеся с интервалом;
+        # сегменты старше log_retention секунд удаляются целиком (0 - хранить все)
+        self.log_retention = float(log_retention)
+        self._log_segments = SegmentManifest(
+            self.log_filename, (".strings",) if log_format == "binary" else ()
+        )
+
+        # файл лога открыт постоянно, записи сбрасываются группами
+        self._log_writer = LogWriter(
+            self.log_filename,
+            flush_interval=log_flush_interval,
+            max_bytes=log_max_bytes,
+            rotate_interval=log_rotate_interval,
+            on_rotate=self._on_log_rotate,
+        )
 
         self._udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._udp_sock.bind((self.sls_ip, self.sls_port))
@@ -35,31 +125,154 @@ class SputnikLogSystem:
         # для того чтобы метод recv блокировал максимум на 0.5 сек
         self._udp_sock.settimeout(0.5)
 
+        # команды принимаются в заранее выделенный буфер
+        self._receiver = DatagramReceiver(self._udp_sock, 1024, buffer_count=1)
+
         self._sender_msg_thr = thr.Thread(target=self._sender_msg)
 
         # поток должен убиться если основной завершен
         self._sender_msg_thr.daemon = True
 
-        # очередь FIFO для отправки сообщений
-        # NOTE: желательно добавить синхронизацию, это критическая секция
-        self._fifo_queue = deque()
-        self._fifo_queue_lock = thr.Lock()
+        # ограниченная очередь отправки, живая телеметрия идет раньше повтора лога;
+        # отправитель ждет на ней и просыпается только когда появились сообщения
+        self._fifo_queue = DownlinkQueue(queue_maxlen, queue_policy)
+
+        # активные повторы лога по (device, sensor) или request_id и их флаги отмены,
+        # replay_rate ограничивает темп повтора в сообщениях/с (0 - без ограничения)
+        self.replay_rate = float(replay_rate)
+        self._replays = {}
+        self._replays_lock = thr.Lock()
+
+        # getlog по хвостам файлов больше scan_threshold байт фильтруется
+        # в scan_workers процессах (0 - всегда в своем потоке)
+        self.scan_workers = int(scan_workers)
+        self.scan_threshold = int(scan_threshold)
+        self._scan_pool = None
+        self._scan_pool_lock = thr.Lock()
+
+        # живая телеметрия и повторы с request_id нумеруются (seq) в своих потоках,
+        # последние retransmit_size сообщений потока можно запросить повторно
+        self._retransmit = RetransmitBuffer(retransmit_size)
+        self._live_seq = itertools.count(1)
+        self._live_sent = self._retransmit.open(LIVE_STREAM)
+
+        # симулятор парка (simulator.FleetSimulator) вместо одной пары
+        # сообщений за итерацию дает пачку записей многих (device, sensor)
+        self.simulator = simulator
+
+        # телеметрия генерируется каждые tick секунд по монотонным часам
+        # в своем потоке, прием и обработка команд ее не задерживают
+        self.tick = float(tick)
+        self._ticker = FixedRateTicker(self.tick)
+        self._stopped = thr.Event()
+        self._producer_thr = thr.Thread(target=self._run_producer)
+        self._producer_thr.daemon = True
+
+        # метрики процесса, при metrics_port отдаются по HTTP на 127.0.0.1
+        # в формате Prometheus (0 - свободный порт)
+        self.metrics_port = metrics_port
+        self._metrics_server = None
+        self.metrics = MetricsRegistry("sputnik_")
+        self._init_metrics()
+
+    def _init_metrics(self):
+        metrics = self.metrics
+        metrics.gauge(
+            "queue_depth",
+            "Messages waiting in the downlink queue",
+            lambda: len(self._fifo_queue),
+        )
+        metrics.counter(
+            "queue_dropped_total",
+            "Messages dropped by the downlink queue policy",
+            lambda: sum(self._fifo_queue.dropped),
+        )
+        metrics.counter(
+            "producer_missed_ticks_total",
+            "Telemetry ticks skipped by the producer",
+            lambda: self._ticker.missed,
+        )
+        self._sent_messages = metrics.counter("sent_messages_total", "Messages sent")
+        self._sent_datagrams = metrics.counter(
+            "sent_datagrams_total", "Datagrams sent"
+        )
+        self._sent_bytes = metrics.counter("sent_bytes_total", "Datagram bytes sent")
+        self._send_seconds = metrics.histogram(
+            "send_seconds", "Time to pack and send one drained batch"
+        )
+        self._log_records = metrics.counter(
+            "log_records_total", "Records written to the onboard log"
+        )
+        self._commands = metrics.counter("commands_total", "Commands handled")
+        self._json_errors = metrics.counter(
+            "json_decode_errors_total", "Commands that are not valid JSON"
+        )
+        self._getlog_records = metrics.counter(
+            "getlog_records_total", "Records replayed by getlog"
+        )
+        self._getlog_seconds = metrics.histogram(
+            "getlog_seconds", "Duration of a getlog replay"
+        )
+
+    def _start_metrics(self):
+        if self.metrics_port is None or self._metrics_server is not None:
+            return
+
+        self._metrics_server = MetricsServer(self.metrics, port=self.metrics_port)
+        self._metrics_server.start()
+        host, port = self._metrics_server.address
+        print(f"Metrics: http://{host}:{port}/metrics")
+
+    def _enqueue(self, *msgs, priority=LIVE, cancel=None):
+        if priority == LIVE:
+            for msg in msgs:
+                msg["seq"] = next(self._live_seq)
+                self._retransmit.add(self._live_sent, msg)
+
+        self._fifo_queue.put_many(msgs, priority, cancel=cancel)
 
     def _send_msg(self):
-        with self._fifo_queue_lock:
-            msg_to_send = self._fifo_queue.popleft()
+        """Отправляет все накопленные сообщения, упаковывая их в датаграммы до mtu байт"""
 
-        self._udp_sock.sendto(
-            json.dumps(msg_to_send).encode(), (self.gs_ip, self.gs_port)
-        )
-        print(f'Sent: "{msg_to_send}"')
+        msgs_to_send = self._fifo_queue.drain()
+        started = time.perf_counter()
+
+        datagrams = self._pack_datagrams(msgs_to_send)
+        for datagram in datagrams:
+            self._udp_sock.sendto(datagram, (self.gs_ip, self.gs_port))
+
+        self._count_sent(msgs_to_send, datagrams, started)
+
+        for msg_to_send in msgs_to_send:
+            print(f'Sent: "{msg_to_send}"')
+
+    def _pack_datagrams(self, msgs) -> list[bytes]:
+        if self.replay_encoding == "zlib":
+            # записи самописца (source "log") приходят только из повтора getlog
+            live, replay = [], []
+            for msg in msgs:
+                source = msg["message"].split(" ", 3)[2]
+                (replay if source == "log" else live).append(msg)
+
+            if replay:
+                return self._pack_msgs(live) + pack_batch_datagrams(replay, self.mtu)
+
+        return self._pack_msgs(msgs)
+
+    def _pack_msgs(self, msgs) -> list[bytes]:
+        if self.wire_format == "binary":
+            return pack_binary_datagrams(msgs, self.mtu)
+        return pack_datagrams(msgs, self.mtu)
+
+    def _count_sent(self, msgs, datagrams, started: float):
+        self._send_seconds.observe(time.perf_counter() - started)
+        self._sent_messages.inc(len(msgs))
+        self._sent_datagrams.inc(len(datagrams))
+        self._sent_bytes.inc(sum(len(datagram) for datagram in datagrams))
 
     def _sender_msg(self):
         while True:
-            time.sleep(0.05)
-            if not self._fifo_queue:
-                continue
-
+            self._fifo_queue.wait()
             self._send_msg()
 
     @staticmethod
@@ -77,7 +290,7 @@ class SputnikLogSystem:
         return log
 
     @staticmethod
-    def generate_online_message() -> dict:
+    def generate_online_message(checksum_mode="sum") -> dict:
         now = datetime.now()
         voltage = round(random.random() * random.randint(3, 10), 3)
         message = {
@@ -85,7 +298,7 @@ class SputnikLogSystem:
             "message": f"{now} online 2 voltage {voltage}",
         }
 
-        checksum = calc_checksum(*message["message"].split())
+        checksum = make_checksum(message["message"].split(), checksum_mode)
         message["message"] = message["message"] + f" {checksum}"
 
         return message
@@ -93,95 +306,339 @@ class SputnikLogSystem:
     def _receive_command(self) -> RequestMessage | None:
         try:
             # сообщение весит меньше КиБ
-            data = self._udp_sock.recv(1024)
-            req_msg = json.loads(data)
-        except (json.JSONDecodeError, TimeoutError, ConnectionError) as e:
+            data = bytes(self._receiver.receive())
+        except (TimeoutError, ConnectionError) as e:
             if not isinstance(e, TimeoutError):
                 print(e)
             return None
 
+        return self._parse_command(data)
+
+    def _parse_command(self, data: bytes) -> RequestMessage | ResendMessage | None:
+        try:
+            req_msg = json.loads(data)
+        except json.JSONDecodeError as e:
+            print(e)
+            self._json_errors.inc()
+            return None
+
+        if req_msg["command"] == "resend":
+            return ResendMessage(
+                req_msg["command"],
+                req_msg.get("request_id"),
+                [(first, last) for first, last in req_msg["ranges"]],
+            )
+
         req_msg = RequestMessage(
             req_msg["command"],
             req_msg["interval"],
             req_msg["device"],
             req_msg["sensor"],
+            req_msg.get("request_id"),
         )
 
         print(
-            f"command: {req_msg.command} | interval: {req_msg.interval} | device: {req_msg.device} | sensor: {req_msg.sensor} | at time: {datetime.now()}"
+            f"command: {req_msg.command} | interval: {req_msg.interval} | device: {req_msg.device} | sensor: {req_msg.sensor} | request_id: {req_msg.request_id} | at time: {datetime.now()}"
         )
         return req_msg
 
-    def _handle_command(self, req_msg: RequestMessage):
-        now = datetime.now()
-        file = open(self.log_filename, "r")
+    def _iter_file_lines(self, filename, req_msg: RequestMessage, since: datetime):
+        """Строки пары (device, sensor) из одного файла лога без индекса"""
+
+        return iter_file_lines(
+            filename, self.log_format, since, req_msg.device, req_msg.sensor
+        )
+
+    def _get_scan_pool(self) -> ProcessPoolExecutor:
+        with self._scan_pool_lock:
+            if self._scan_pool is None:
+                # в процессе уже работают потоки, поэтому не fork
+                self._scan_pool = ProcessPoolExecutor(
+                    self.scan_workers, mp_context=mp.get_context("spawn")
+                )
+            return self._scan_pool
+
+    def _scan_parallel(self, plan, req_msg: RequestMessage, since: datetime):
+        """Фильтрует хвосты файлов по частям в пуле процессов и сливает по времени"""
+
+        pool = self._get_scan_pool()
+        tasks = [
+            pool.submit(
+                scan_part,
+                filename,
+                self.log_format,
+                since,
+                req_msg.device,
+                req_msg.sensor,
+                start,
+                stop,
+            )
+            for filename, start, stop in split_plan(
+                plan, self.scan_workers, self.log_format
+            )
+        ]
+        yield from merge_lines([task.result() for task in tasks])
+
+    def _iter_log_lines(
+        self, req_msg: RequestMessage, since: datetime, flushed: int | None = None
+    ):
+        """Строки лога пары (device, sensor) записанные после since.
+
+        Сначала читаются закрытые сегменты, которые по манифесту пересекаются
+        с интервалом и содержат пару, затем текущий файл лога. Если хвосты
+        файлов после since больше scan_threshold байт, они фильтруются
+        параллельно (scan_workers процессов).
 
-        eof = False
-        msgs = []
+        flushed - размер файла после последнего flush(): записи индекса дальше
+        этого смещения могут быть еще в буфере писателя и пропускаются.
+        """
 
-        while not eof:
-            newline = file.readline().strip()
+        filenames = self._log_segments.find(
+            req_msg.device, req_msg.sensor, since.timestamp()
+        )
+        # без индекса текущий файл читается так же, как закрытые сегменты
+        if self._log_index is None:
+            filenames.append(self.log_filename)
+
+        plan = plan_scan(filenames, self.log_format, since) if self.scan_workers else []
+        if sum(stop - start for _, start, stop in plan) >= max(self.scan_threshold, 1):
+            yield from self._scan_parallel(plan, req_msg, since)
+        else:
+            for filename in filenames:
+                yield from self._iter_file_lines(filename, req_msg, since)
+
+        if self._log_index is None:
+            return
+
+        offsets = self._log_index.find(
+            req_msg.device, req_msg.sensor, since.timestamp()
+        )
+        if not offsets:
+            return
+
+        with open(self.log_filename, "rb") as file:
+            for offset in offsets:
+                if flushed is not None and offset >= flushed:
+                    break
+
+                file.seek(offset)
+                newline = file.readline().decode().strip()
+                if not newline:
+                    break
+                yield newline
+
+    def _system_msg(self, fields, event: str, now: datetime) -> dict:
+        fields = (*fields[:4], "system", event)
+        checksum = make_checksum(fields, self.checksum_mode)
+        return {
+            "recv_time": int(now.timestamp()),
+            "message": " ".join(fields) + f" {checksum}",
+        }
 
-            if not newline:
-                eof = True
-                break
+    def _iter_replay(self, req_msg: RequestMessage, cancel: thr.Event):
+        """Генератор повтора лога: log_start, записи за интервал, log_end.
 
-            dt, tm, src, device, sensor, value = newline.split(" ")
-            dtm = datetime.fromisoformat(dt + "T" + tm)
+        Записи читаются из лога по мере отправки, поэтому в памяти не хранится
+        весь результат. Отмененный повтор обрывается без log_end, блок
+        закрывает повтор, который его заменил.
 
-            delta = now - dtm
+        Если в запросе есть request_id, он повторяется в каждом сообщении,
+        а log_start/log_end отправляются даже при пустом результате, чтобы
+        наземная станция могла отметить запрос выполненным. Такие сообщения
+        нумеруются (seq) с 1 и сохраняются для повторной отправки.
+        """
 
-            if (
-                delta.total_seconds() < int(req_msg.interval)
-                and sensor == str(req_msg.sensor)
-                and device == str(req_msg.device)
-            ):
-                checksum = calc_checksum(dt, tm, src, device, sensor, value)
-                msg = {
-                    "recv_time": int(now.timestamp()),
-                    "message": newline + f" {checksum}",
-                }
-                msgs.append(msg)
+        if req_msg.request_id is None:
+            yield from self._iter_replay_msgs(req_msg, cancel)
+            return
 
-        if msgs:
-            log_start = {
-                "recv_time": int(now.timestamp()),
-                "message": f"{dt} {tm} {src} {device} system log_start {calc_checksum(dt, tm, src, device, 'system', 'log_start')}",
-            }
-            log_end = {
+        sent = self._retransmit.open(req_msg.request_id)
+        for seq, msg in enumerate(self._iter_replay_msgs(req_msg, cancel), 1):
+            msg["request_id"] = req_msg.request_id
+            msg["seq"] = seq
+            self._retransmit.add(sent, msg)
+            yield msg
+
+    def _iter_replay_msgs(self, req_msg: RequestMessage, cancel: thr.Event):
+        now = datetime.now()
+        since = now - timedelta(seconds=int(req_msg.interval))
+
+        # читаем только то, что уже лежит в файле
+        flushed = self._log_writer.flush()
+
+        fields = None
+        for newline in self._iter_log_lines(req_msg, since, flushed):
+            if cancel.is_set():
+                return
+
+            if fields is None:
+                yield self._system_msg(newline.split(" "), "log_start", now)
+
+            fields = newline.split(" ")
+            if self.checksum_mode == "sum":
+                checksum = calc_line_checksum(newline)
+            else:
+                checksum = make_checksum(fields, self.checksum_mode)
+            yield {
                 "recv_time": int(now.timestamp()),
-                "message": f"{dt} {tm} {src} {device} system log_end {calc_checksum(dt, tm, src, device, 'system', 'log_end')}",
+                "message": newline + f" {checksum}",
             }
-            with self._fifo_queue_lock:
-                self._fifo_queue.append(log_start)
-                self._fifo_queue.extend(msgs)
-                self._fifo_queue.append(log_end)
 
-        file.close()
+        if fields is None and req_msg.request_id is not None:
+            fields = (*str(now).split(" "), "log", str(req_msg.device))
+            yield self._system_msg(fields, "log_start", now)
+
+        if fields is not None:
+            yield self._system_msg(fields, "log_end", now)
+
+    def _run_replay(self, req_msg: RequestMessage, key, cancel: thr.Event):
+        period = 1 / self.replay_rate if self.replay_rate else 0
+        next_send = time.monotonic()
+        started = time.perf_counter()
+
+        try:
+            for msg in self._iter_replay(req_msg, cancel):
+                if period:
+                    next_send += period
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        cancel.wait(delay)
+
+                # при заполненной очереди повтор ждет, пока отправитель освободит место
+                self._enqueue(msg, priority=REPLAY, cancel=cancel)
+                self._getlog_records.inc()
+        finally:
+            self._getlog_seconds.observe(time.perf_counter() - started)
+            with self._replays_lock:
+                if self._replays.get(key) is cancel:
+                    del self._replays[key]
+
+    def _run_resend(self, req_msg: ResendMessage):
+        stream = LIVE_STREAM if req_msg.request_id is None else req_msg.request_id
+        for first, last in req_msg.ranges:
+            msgs = self._retransmit.get(stream, first, last)
+            self._enqueue(*msgs, priority=REPLAY)
+
+    def _handle_command(self, req_msg: RequestMessage | ResendMessage) -> thr.Thread:
+        """Запускает повтор лога в отдельном потоке.
+
+        Новая команда для той же пары (device, sensor) отменяет предыдущий повтор.
+        Запросы с request_id выполняются параллельно, отменяет повтор только
+        команда с тем же request_id (повторная отправка запроса).
+
+        Команда resend повторно отправляет только пропущенные сообщения потока
+        из буфера отправленных, не перезапуская повтор.
+        """
+
+        self._commands.inc()
+        if req_msg.command == "resend":
+            resend_thr = thr.Thread(target=self._run_resend, args=(req_msg,))
+            resend_thr.daemon = True
+            resend_thr.start()
+            return resend_thr
+
+        if req_msg.request_id is not None:
+            key = req_msg.request_id
+        else:
+            key = (str(req_msg.device), str(req_msg.sensor))
+        cancel = thr.Event()
+        with self._replays_lock:
+            previous = self._replays.get(key)
+            self._replays[key] = cancel
+
+        if previous is not None:
+            previous.set()
+            self._fifo_queue.interrupt()
+
+        replay_thr = thr.Thread(target=self._run_replay, args=(req_msg, key, cancel))
+        replay_thr.daemon = True
+        replay_thr.start()
+        return replay_thr
+
+    def _on_log_rotate(self, rotated_filename):
+        # смещения индекса относятся к старому файлу, getlog отдает только текущий
+        if self._log_index is not None:
+            self._log_index.clear()
+
+        # бинарный лог без своей таблицы строк не прочитать
+        if self._log_strings is not None:
+            self._log_strings.copy_to(rotated_filename)
+
+        self._log_segments.close_segment(rotated_filename)
+        if self.log_retention:
+            self._log_segments.expire(time.time() - self.log_retention)
 
     def _save_msg(self, msg):
-        with open(self.log_filename, "a") as file:
-            file.write(msg + "\n")
+        device, sensor, timestamp = LogIndex.parse_line(msg)
 
-    def run(self):
-        """Основной метод для запуска системы логов космического аппарата. Блокирующий вызов!"""
+        # при ротации сегмент закрывается внутри write, запись попадает в новый
+        if self._log_strings is not None:
+            self._log_writer.write(encode_record(msg, self._log_strings))
+        else:
+            offset = self._log_writer.write(msg)
+            if self._log_index is not None:
+                self._log_index.add(device, sensor, timestamp, offset)
 
-        self._sender_msg_thr.start()
+        self._log_segments.add(device, sensor, timestamp)
+        self._log_records.inc()
+
+    def _generate_telemetry(self):
+        """Записи телеметрии одной итерации: в лог и в очередь отправки"""
 
-        while 1:
-            message = self.generate_online_message()
-            log = self.generate_log_message()
+        if self.simulator is None:
+            messages = [self.generate_online_message(self.checksum_mode)]
+            logs = [self.generate_log_message()]
+        else:
+            logs, messages = self.simulator.tick(self.checksum_mode)
 
+        for log in logs:
             self._save_msg(log)
 
-            with self._fifo_queue_lock:
-                self._fifo_queue.append(message)
+        if messages:
+            self._enqueue(*messages)
+
+    def _run_producer(self):
+        missed = 0
+        while not self._stopped.wait(self._ticker.delay()):
+            self._generate_telemetry()
 
-            req_msg = self._receive_command()
-            if not req_msg:
-                continue
+            if self._ticker.missed > missed:
+                print(f"Producer missed {self._ticker.missed - missed} ticks")
+                missed = self._ticker.missed
 
-            self._handle_command(req_msg)
+    def run(self):
+        """Основной метод для запуска системы логов космического аппарата. Блокирующий вызов!"""
+
+        self._start_metrics()
+        self._sender_msg_thr.start()
+        self._producer_thr.start()
+
+        try:
+            while 1:
+                req_msg = self._receive_command()
+                if not req_msg:
+                    continue
+
+                self._handle_command(req_msg)
+        finally:
+            self.close()
+
+    def close(self):
+        """Останавливает генерацию, сбрасывает буферизованные записи лога и закрывает файл"""
+
+        self._stopped.set()
+        if self._producer_thr.is_alive():
+            self._producer_thr.join()
+
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+
+        self._log_writer.close()
+        with self._scan_pool_lock:
+            if self._scan_pool is not None:
+                self._scan_pool.shutdown(cancel_futures=True)
+                self._scan_pool = None
 
 
 def main():
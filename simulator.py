@@ -0,0 +1,149 @@
+import argparse
+import time
+
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from tools import calc_checksums, make_checksum
+
+
+class FleetSimulator:
+    def __init__(
+        self,
+        devices=1000,
+        sensors=("temperature", "voltage", "pressure"),
+        rate=1.0,
+        online_fraction=0.1,
+        warning_probability=0.05,
+        failure_probability=0.01,
+        value_range=(0.0, 50.0),
+        first_device=100,
+        seed=None,
+    ):
+        """Генератор телеметрии парка устройств для нагрузочных тестов.
+
+        Каждая пара (device, sensor) дает в среднем rate записей в секунду
+        (пуассоновский поток). Все записи идут в бортовой лог, доля
+        online_fraction из них дополнительно отправляется живой телеметрией.
+        Значения, отказы и метки времени генерируются пачкой на весь тик
+        средствами NumPy, записи тика упорядочены по времени.
+        """
+
+        if np is None:
+            raise RuntimeError("FleetSimulator requires NumPy")
+
+        self.devices = int(devices)
+        self.sensors = tuple(sensors)
+        self.rate = float(rate)
+        self.online_fraction = float(online_fraction)
+        self.warning_probability = float(warning_probability)
+        self.failure_probability = float(failure_probability)
+        self.low, self.high = map(float, value_range)
+
+        self._rng = np.random.default_rng(seed)
+        # пара i - устройство first_device + i // len(sensors), датчик i % len(sensors)
+        pairs = np.arange(self.devices * len(self.sensors))
+        self._pair_devices = (first_device + pairs // len(self.sensors)).astype(str)
+        self._pair_sensors = np.array(self.sensors)[pairs % len(self.sensors)]
+
+        self._last_tick = time.monotonic()
+        self.generated = 0
+
+    def generate(self, now: datetime, elapsed: float) -> tuple[list[str], list[dict]]:
+        """Записи за elapsed секунд до now: (строки лога, сообщения живой телеметрии)"""
+
+        counts = self._rng.poisson(self.rate * elapsed, len(self._pair_devices))
+        total = int(counts.sum())
+        if not total:
+            return [], []
+
+        pairs = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.sort(self._rng.uniform(-elapsed, 0.0, total))
+        order = self._rng.permutation(total)
+        pairs = pairs[order]
+
+        timestamps = np.datetime64(now, "us") + (offsets * 1e6).astype("timedelta64[us]")
+        timestamps = np.char.replace(
+            np.datetime_as_string(timestamps, unit="us"), "T", " "
+        )
+
+        values = np.round(self._rng.uniform(self.low, self.high, total), 3).astype(str)
+        failures = self._rng.random(total)
+        values = np.where(
+            failures < self.failure_probability, "ERROR:sensor_fail", values
+        )
+        values = np.where(
+            (failures >= self.failure_probability)
+            & (failures < self.failure_probability + self.warning_probability),
+            "WARNING:overheat",
+            values,
+        )
+
+        devices = self._pair_devices[pairs]
+        sensors = self._pair_sensors[pairs]
+        logs = [
+            f"{timestamp} log {device} {sensor} {value}"
+            for timestamp, device, sensor, value in zip(
+                timestamps.tolist(), devices.tolist(), sensors.tolist(), values.tolist()
+            )
+        ]
+
+        online = np.flatnonzero(self._rng.random(total) < self.online_fraction)
+        recv_time = int(now.timestamp())
+        messages = [
+            {"recv_time": recv_time, "message": logs[i].replace(" log ", " online ", 1)}
+            for i in online.tolist()
+        ]
+
+        self.generated += total
+        return logs, messages
+
+    def tick(self, checksum_mode="sum") -> tuple[list[str], list[dict]]:
+        """Записи с прошлого тика; сообщениям живой телеметрии добавляется контрольная сумма"""
+
+        now = time.monotonic()
+        elapsed, self._last_tick = now - self._last_tick, now
+        logs, messages = self.generate(datetime.now(), elapsed)
+
+        lines = [message["message"] for message in messages]
+        if checksum_mode == "sum":
+            # аддитивные суммы всей пачки считаются векторно
+            checksums = calc_checksums(lines)
+        else:
+            checksums = [make_checksum(line.split(" "), checksum_mode) for line in lines]
+        for message, checksum in zip(messages, checksums):
+            message["message"] += f" {checksum}"
+
+        return logs, messages
+
+
+def main():
+    from server import SputnikLogSystem
+
+    parser = argparse.ArgumentParser(description="Бортовая система с симулятором парка")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--sensors", default="temperature,voltage,pressure")
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--online-fraction", type=float, default=0.1)
+    parser.add_argument("--failure-probability", type=float, default=0.01)
+    parser.add_argument("--warning-probability", type=float, default=0.05)
+    args = parser.parse_args()
+
+    simulator = FleetSimulator(
+        devices=args.devices,
+        sensors=args.sensors.split(","),
+        rate=args.rate,
+        online_fraction=args.online_fraction,
+        warning_probability=args.warning_probability,
+        failure_probability=args.failure_probability,
+    )
+    sputnik = SputnikLogSystem("127.0.0.1", 5001, "127.0.0.1", 5002, simulator=simulator)
+    sputnik.run()
+
+
+if __name__ == "__main__":
+    main()
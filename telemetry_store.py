@@ -0,0 +1,177 @@
+import sqlite3
+import time
+import threading as thr
+
+from datetime import datetime
+
+FAILURE_NONE = 0
+FAILURE_WARNING = 1
+FAILURE_ERROR = 2
+
+
+def classify_failure(value: str) -> int:
+    value = value.lower()
+    if "error" in value:
+        return FAILURE_ERROR
+    if "warning" in value:
+        return FAILURE_WARNING
+    return FAILURE_NONE
+
+
+class TelemetryStore:
+    def __init__(self, filename, batch_size=500, commit_interval=1.0):
+        """Хранилище телеметрии наземной станции в SQLite (режим WAL).
+
+        Записи копятся в памяти и пишутся одной транзакцией, когда набралось
+        batch_size записей или прошло commit_interval секунд с прошлой
+        транзакции (проверяется при записи и фоновым потоком). Перед запросами
+        буфер сбрасывается, перед выходом нужно вызвать close().
+        """
+
+        self.filename = filename
+        self.batch_size = int(batch_size)
+        self.commit_interval = float(commit_interval)
+
+        self._lock = thr.Lock()
+        self._records = []
+        self._commands = []
+        self._last_commit = time.monotonic()
+
+        # соединение используется потоком приема и потоком консоли
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS telemetry (
+                timestamp REAL NOT NULL,
+                source TEXT NOT NULL,
+                device TEXT NOT NULL,
+                sensor TEXT NOT NULL,
+                value TEXT NOT NULL,
+                failure INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS telemetry_device_sensor_timestamp
+                ON telemetry (device, sensor, timestamp);
+            CREATE INDEX IF NOT EXISTS telemetry_device_failure_timestamp
+                ON telemetry (device, failure, timestamp);
+
+            CREATE TABLE IF NOT EXISTS commands (
+                timestamp REAL NOT NULL,
+                command TEXT NOT NULL,
+                interval INTEGER,
+                device TEXT,
+                sensor TEXT,
+                request_id INTEGER
+            );
+            """
+        )
+        self._conn.commit()
+
+        self._closed = thr.Event()
+        if self.commit_interval > 0:
+            self._committer_thr = thr.Thread(target=self._commit_loop)
+            self._committer_thr.daemon = True
+            self._committer_thr.start()
+
+    def _commit_loop(self):
+        while not self._closed.wait(self.commit_interval):
+            with self._lock:
+                if self._closed.is_set():
+                    return
+                if (self._records or self._commands) and (
+                    time.monotonic() - self._last_commit >= self.commit_interval
+                ):
+                    self._commit()
+
+    def save(self, **kwargs):
+        """Принимает те же поля, что GroundLogSystem._save_log"""
+
+        if "val" in kwargs:
+            timestamp = datetime.fromisoformat(kwargs["dt"] + "T" + kwargs["tm"])
+            row = (
+                timestamp.timestamp(),
+                kwargs["src"],
+                str(kwargs["device"]),
+                kwargs["sensor"],
+                kwargs["val"],
+                classify_failure(kwargs["val"]),
+            )
+            records = self._records
+        elif "command" in kwargs:
+            row = (
+                datetime.fromisoformat(kwargs["datetime"]).timestamp(),
+                kwargs["command"],
+                kwargs.get("interval"),
+                str(kwargs.get("device")),
+                kwargs.get("sensor"),
+                kwargs.get("request_id"),
+            )
+            records = self._commands
+        else:
+            return
+
+        with self._lock:
+            records.append(row)
+            if (
+                len(self._records) + len(self._commands) >= self.batch_size
+                or time.monotonic() - self._last_commit >= self.commit_interval
+            ):
+                self._commit()
+
+    def _commit(self):
+        with self._conn:
+            if self._records:
+                self._conn.executemany(
+                    "INSERT INTO telemetry VALUES (?, ?, ?, ?, ?, ?)", self._records
+                )
+            if self._commands:
+                self._conn.executemany(
+                    "INSERT INTO commands VALUES (?, ?, ?, ?, ?, ?)", self._commands
+                )
+
+        self._records.clear()
+        self._commands.clear()
+        self._last_commit = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def query_range(self, device, sensor, since: float, until: float | None = None):
+        """Записи пары (device, sensor) за интервал, по индексу (device, sensor, timestamp)"""
+
+        until = time.time() if until is None else until
+        with self._lock:
+            self._commit()
+            return self._conn.execute(
+                "SELECT timestamp, source, value FROM telemetry"
+                " WHERE device = ? AND sensor = ? AND timestamp > ? AND timestamp <= ?"
+                " ORDER BY timestamp",
+                (str(device), str(sensor), since, until),
+            ).fetchall()
+
+    def failure_counts(self, device, since: float = 0.0) -> tuple[int, int]:
+        """Количество (ошибок, предупреждений) устройства после since"""
+
+        with self._lock:
+            self._commit()
+            counts = dict(
+                self._conn.execute(
+                    "SELECT failure, COUNT(*) FROM telemetry"
+                    " WHERE device = ? AND failure IN (?, ?) AND timestamp > ?"
+                    " GROUP BY failure",
+                    (str(device), FAILURE_ERROR, FAILURE_WARNING, since),
+                ).fetchall()
+            )
+
+        return counts.get(FAILURE_ERROR, 0), counts.get(FAILURE_WARNING, 0)
+
+    def close(self):
+        with self._lock:
+            if self._closed.is_set():
+                return
+
+            self._closed.set()
+            self._commit()
+            self._conn.close()
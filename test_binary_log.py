@@ -0,0 +1,39 @@
+import os
+
+from binary_log import (
+    RECORD,
+    StringTable,
+    binary_to_text,
+    decode_record,
+    encode_record,
+    text_to_binary,
+)
+
+LINES = [
+    "2025-08-26 13:28:40.000001 log 3 temperature 25",
+    "2025-08-26 13:28:41.500000 log 3 temperature WARNING:overheat",
+    "2025-08-26 13:28:42 online 2 voltage 9.123",
+]
+
+
+def test_record_roundtrip(tmp_path):
+    strings = StringTable(str(tmp_path / "test.blog"))
+    for line in LINES:
+        record = encode_record(line, strings)
+        assert len(record) == RECORD.size
+        assert decode_record(record, 0, strings) == line
+
+
+def test_convert_text_binary_text(tmp_path):
+    text_filename = str(tmp_path / "test.log")
+    binary_filename = str(tmp_path / "test.blog")
+    restored_filename = str(tmp_path / "restored.log")
+    with open(text_filename, "w") as file:
+        file.write("\n".join(LINES) + "\n")
+
+    text_to_binary(text_filename, binary_filename)
+    assert os.path.getsize(binary_filename) == RECORD.size * len(LINES)
+
+    binary_to_text(binary_filename, restored_filename)
+    with open(restored_filename) as file:
+        assert file.read().splitlines() == LINES
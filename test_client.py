@@ -1,9 +1,16 @@
 import pytest
 import json
 import os
+import socket
+import time
+
+from datetime import datetime, timedelta
 
 from message_types import Message
+from sequencing import LIVE_STREAM
+from server import SputnikLogSystem
 from client import GroundLogSystem
+from tools import calc_checksum
 
 
 @pytest.fixture(scope="module")
@@ -79,12 +86,32 @@ def test_handle_online(ground_system, msg, output):
     ],
 )
 def test_get_msg(ground_system, mocker, message_json):
-    mocker.patch(
-        "socket.socket.recv",
-        lambda x, y: json.dumps(message_json).encode(),
+    mocker.patch.object(
+        ground_system._receiver,
+        "receive",
+        lambda: memoryview(json.dumps(message_json).encode()),
+    )
+    msgs = ground_system._get_msg()
+    assert len(msgs) == 1
+    assert isinstance(msgs[0], Message) == True
+
+
+def test_get_batched_msg(ground_system, mocker):
+    message_json = {
+        "recv_time": 1756204412,
+        "message": "2025-08-26 13:33:32.321327 online 2 voltage 9.123 2972",
+    }
+    broken_json = {
+        "recv_time": 1756204412,
+        "message": "2025-08-26 13:33:32.321327 online 2 voltage 9.123 272",
+    }
+    mocker.patch.object(
+        ground_system._receiver,
+        "receive",
+        lambda: memoryview(json.dumps([message_json, broken_json, message_json]).encode()),
     )
-    msg = ground_system._get_msg()
-    assert isinstance(msg, Message) == True
+    msgs = ground_system._get_msg()
+    assert len(msgs) == 2
 
 
 @pytest.mark.parametrize(
@@ -101,12 +128,13 @@ def test_get_msg(ground_system, mocker, message_json):
     ],
 )
 def test_get_broken_msg(ground_system, mocker, message_json):
-    mocker.patch(
-        "socket.socket.recv",
-        lambda x, y: json.dumps(message_json).encode(),
+    mocker.patch.object(
+        ground_system._receiver,
+        "receive",
+        lambda: memoryview(json.dumps(message_json).encode()),
     )
-    msg = ground_system._get_msg()
-    assert msg == None
+    msgs = ground_system._get_msg()
+    assert msgs == []
 
 
 @pytest.mark.parametrize(
@@ -142,6 +170,397 @@ def test_request_log(ground_system, mocker, interval, device, sensor):
         Message("2025-08-26", "13:28:40", "log", "2", "voltage", "5.555", ""),
     ],
 )
-def test_handle_message(ground_system, message):
-    ground_system._last_request_time -= 5  # для того чтобы проверить отправку запроса
+def test_handle_message(ground_system, message, capsys):
     ground_system._handle_message(message)
+
+    assert f"'device': '{message.device}'" in capsys.readouterr().out
+    ground_system._log_writer.flush()
+    with open(ground_system._log_writer.filename) as file:
+        received, line = file.readlines()[-1].split(" ", 1)
+    assert line == (
+        f"dt={message.date} tm={message.time} src={message.source}"
+        f" device={message.device} sensor={message.sensor} val={message.value}\n"
+    )
+    assert abs(float(received.removeprefix("rt=")) - time.time()) < 5
+
+
+def test_failure_counters(ground_system):
+    session_start = ground_system._start_datetime
+    before = session_start.isoformat(sep=" ").split(" ")
+    after = datetime.now().isoformat(sep=" ").split(" ")
+    errors, warnings = ground_system._get_failure_count("7")
+
+    for message in (
+        Message(*after, "log", "7", "temperature", "ERROR:sensor_fail", ""),
+        Message(*after, "log", "7", "temperature", "WARNING:overheat", ""),
+        Message(*after, "log", "7", "temperature", "WARNING:overheat", ""),
+        Message(*before, "log", "7", "temperature", "ERROR:sensor_fail", ""),
+        Message(*after, "log", "7", "temperature", "25", ""),
+    ):
+        ground_system._handle_message(message)
+
+    assert ground_system._get_failure_count("7") == (errors + 1, warnings + 2)
+
+    ground_system._rebuild_failure_counts()
+    assert ground_system._get_failure_count("7") == (errors + 1, warnings + 2)
+
+
+def test_rebuild_reads_only_session_tail(tmp_path, mocker):
+    log_filename = tmp_path / "client.log"
+    session_start = datetime.now()
+    start = session_start.timestamp()
+    after = (session_start + timedelta(seconds=1)).isoformat(sep=" ").split(" ")
+    with open(log_filename, "w") as file:
+        # старый формат без rt и прошлая сессия: принято до начала сессии
+        file.write(f"dt={after[0]} tm={after[1]} src=log device=7 val=ERROR\n")
+        for i in range(100):
+            file.write(
+                f"rt={start - 100 + i} dt={after[0]} tm={after[1]} src=log"
+                " device=7 sensor=t val=WARNING\n"
+            )
+        file.write(
+            f"rt={start + 1} dt={after[0]} tm={after[1]} src=log"
+            " device=7 sensor=t val=ERROR:sensor_fail\n"
+        )
+
+    ground = GroundLogSystem(
+        "127.0.0.1",
+        5013,
+        "127.0.0.1",
+        5023,
+        log_filename=str(log_filename),
+        session_start=session_start,
+    )
+    count_failure = mocker.spy(ground, "_count_failure")
+    try:
+        ground._rebuild_failure_counts()
+    finally:
+        ground._udp_sock.close()
+        ground.close()
+
+    assert count_failure.call_count == 1
+    assert ground._get_failure_count("7") == (1, 0)
+
+
+def test_drain_msgs(ground_system, mocker):
+    handled = []
+    mocker.patch.object(ground_system, "_handle_message", handled.append)
+    message_json = {
+        "recv_time": 1756204412,
+        "message": "2025-08-26 13:33:32.321327 online 2 voltage 9.123 2972",
+    }
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _ in range(3):
+            sock.sendto(json.dumps(message_json).encode(), ("127.0.0.1", 5010))
+
+    ground_system._udp_sock.setblocking(False)
+    time.sleep(0.05)
+    ground_system._drain_msgs()
+    ground_system._udp_sock.setblocking(True)
+
+    assert len(handled) == 3
+
+
+def test_drain_msgs_more_than_buffer_pool(tmp_path, mocker):
+    ground = GroundLogSystem(
+        "127.0.0.1",
+        5012,
+        "127.0.0.1",
+        5022,
+        log_filename=str(tmp_path / "test_client.log"),
+        rcvbuf=256 * 1024,
+    )
+    # ядро удваивает запрошенный размер буфера
+    assert ground._receiver.rcvbuf >= 256 * 1024
+
+    handled = []
+    mocker.patch.object(ground, "_handle_message", handled.append)
+    message_json = {
+        "recv_time": 1756204412,
+        "message": "2025-08-26 13:33:32.321327 online 2 voltage 9.123 2972",
+    }
+    count = ground._receiver.buffer_count * 2 + 5
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _ in range(count):
+            sock.sendto(json.dumps(message_json).encode(), ("127.0.0.1", 5012))
+
+    ground._udp_sock.setblocking(False)
+    time.sleep(0.05)
+    ground._drain_msgs()
+
+    assert len(handled) == count
+    assert ground._receiver.received == count
+    assert ground._receiver.kernel_dropped in (0, None)
+    ground._udp_sock.close()
+
+
+def test_drain_reports_kernel_drops(tmp_path, capsys):
+    ground = GroundLogSystem(
+        "127.0.0.1",
+        5013,
+        "127.0.0.1",
+        5023,
+        log_filename=str(tmp_path / "test_client.log"),
+        rcvbuf=4096,
+    )
+    if ground._receiver.kernel_dropped is None:
+        pytest.skip("ОС не сообщает о потерянных датаграммах")
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _ in range(500):
+            sock.sendto(b"x" * 512, ("127.0.0.1", 5013))
+
+    ground._udp_sock.setblocking(False)
+    time.sleep(0.05)
+    ground._drain_msgs()
+
+    # счетчик потерь ядро передает со следующей принятой датаграммой
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(b"x", ("127.0.0.1", 5013))
+    time.sleep(0.05)
+    ground._drain_msgs()
+
+    assert ground._receiver.kernel_dropped > 0
+    assert "Kernel dropped" in capsys.readouterr().out
+    ground._udp_sock.close()
+
+
+def test_dispatch_request(ground_system, mocker):
+    send = mocker.patch.object(ground_system, "_send_log_request")
+    ground_system._request_queue.clear()
+    ground_system._inflight.clear()
+    ground_system._request_queue.extend([(5, 3, "temperature"), (10, 3, "temperature")])
+
+    ground_system._dispatch_request()
+    assert send.call_count == 2
+    assert len(ground_system._inflight) == 2
+    request_id = send.call_args_list[0].kwargs["request_id"]
+
+    # log_end завершает запрос
+    for value in ("log_start", "log_end"):
+        ground_system._handle_message(
+            Message("2025-08-26", "13:28:40", "log", "3", "system", value, "", request_id)
+        )
+    assert request_id not in ground_system._inflight
+
+    # запрос без ответа отправляется повторно с тем же request_id
+    (pending_id,) = ground_system._inflight
+    ground_system._inflight[pending_id]["active_at"] -= ground_system.request_timeout
+    ground_system._dispatch_request()
+    assert send.call_args.kwargs["request_id"] == pending_id
+    assert ground_system._inflight[pending_id]["retries"] == 1
+
+
+def test_store_requests(tmp_path, capsys):
+    ground = GroundLogSystem(
+        "127.0.0.1",
+        5011,
+        "127.0.0.1",
+        5021,
+        log_filename=str(tmp_path / "test_client.log"),
+        store_filename=str(tmp_path / "test_client.db"),
+    )
+    now = datetime.now().isoformat(sep=" ").split(" ")
+    for value in ("25", "ERROR:sensor_fail", "WARNING:overheat", "WARNING:overheat"):
+        ground._handle_message(Message(*now, "log", "3", "temperature", value, ""))
+    capsys.readouterr()
+
+    ground._handle_request(["query", "60", "3", "temperature"])
+    assert len(capsys.readouterr().out.splitlines()) == 4
+
+    ground._handle_request(["dbfails", "3"])
+    assert "Session errors: 1 || Session warnings: 2" in capsys.readouterr().out
+
+    ground._udp_sock.close()
+    ground._store.close()
+
+
+def test_get_binary_msg(ground_system, mocker):
+    from wire import pack_binary_datagrams
+
+    message_json = {
+        "recv_time": 1756204412,
+        "message": "2025-08-26 13:33:32.321327 online 2 voltage 9.123 2972",
+    }
+    (datagram,) = pack_binary_datagrams([message_json], ground_system.mtu)
+    mocker.patch.object(ground_system._receiver, "receive", lambda: memoryview(datagram))
+
+    (msg,) = ground_system._get_msg()
+    assert msg.value == "9.123"
+
+
+def test_long_replay_does_not_time_out(ground_system, mocker):
+    send = mocker.patch.object(ground_system, "_send_log_request")
+    ground_system._request_queue.clear()
+    ground_system._inflight.clear()
+    ground_system._request_queue.append((500, 3, "temperature"))
+    ground_system._dispatch_request()
+    (request_id,) = ground_system._inflight
+    request = ground_system._inflight[request_id]
+
+    # повтор идет дольше request_timeout, но сообщения приходят
+    request["active_at"] -= ground_system.request_timeout
+    ground_system._handle_message(
+        Message("2025-08-26", "13:28:40", "log", "3", "temperature", "5", "", request_id)
+    )
+    ground_system._dispatch_request()
+    assert send.call_count == 1
+    assert request["received"] == 1
+
+    # тишина дольше таймаута: повтор запроса со сбросом счетчика
+    request["active_at"] -= ground_system.request_timeout
+    ground_system._dispatch_request()
+    assert send.call_count == 2
+    assert request["received"] == 0
+    ground_system._inflight.clear()
+
+
+def test_store_commits_on_timer(tmp_path):
+    import sqlite3
+    from telemetry_store import TelemetryStore
+
+    filename = str(tmp_path / "test_store.db")
+    store = TelemetryStore(filename, commit_interval=0.05)
+    store.save(
+        dt="2025-08-26", tm="13:28:40", src="log", device=3, sensor="temperature", val="5"
+    )
+    time.sleep(0.3)
+
+    with sqlite3.connect(filename) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM telemetry").fetchone() == (1,)
+    store.close()
+    store.close()
+
+
+def test_sequence_gap_requests_resend(ground_system, mocker):
+    send = mocker.patch.object(ground_system, "_send_log_request")
+    resend = mocker.patch.object(ground_system, "_send_resend")
+    ground_system._request_queue.clear()
+    ground_system._inflight.clear()
+    ground_system._request_queue.append((5, 3, "temperature"))
+    ground_system._dispatch_request()
+    (request_id,) = ground_system._inflight
+
+    def replay(seq, sensor, value):
+        return Message(
+            "2025-08-26", "13:28:40", "log", "3", sensor, value, "", request_id, seq
+        )
+
+    # потерялось сообщение 2, log_end пришел раньше дозапрошенного пропуска
+    for message in (
+        replay(1, "system", "log_start"),
+        replay(3, "temperature", "6"),
+        replay(3, "temperature", "6"),
+        replay(4, "system", "log_end"),
+    ):
+        ground_system._receive_msg(message)
+    ground_system._sequences[request_id]._pending_since -= ground_system.reorder_timeout
+    ground_system._check_sequences()
+
+    resend.assert_called_once_with(request_id, [(2, 2)])
+    assert ground_system._inflight[request_id]["received"] == 1
+
+    ground_system._receive_msg(replay(2, "temperature", "5"))
+    assert request_id not in ground_system._inflight
+    assert send.call_count == 1
+
+
+def test_lost_log_end_resends_tail(ground_system, mocker):
+    send = mocker.patch.object(ground_system, "_send_log_request")
+    resend = mocker.patch.object(ground_system, "_send_resend")
+    ground_system._request_queue.clear()
+    ground_system._inflight.clear()
+    ground_system._request_queue.append((5, 3, "temperature"))
+    ground_system._dispatch_request()
+    (request_id,) = ground_system._inflight
+
+    ground_system._receive_msg(
+        Message(
+            "2025-08-26", "13:28:40", "log", "3", "system", "log_start", "", request_id, 1
+        )
+    )
+    ground_system._inflight[request_id]["active_at"] -= ground_system.request_timeout
+    ground_system._dispatch_request()
+
+    # весь getlog не перезапускается, дозапрашивается хвост потока
+    assert send.call_count == 1
+    resend.assert_called_once_with(request_id, [(2, None)])
+    ground_system._inflight.clear()
+
+
+def test_stats_request(ground_system, capsys):
+    now = datetime.now().isoformat(sep=" ").split(" ")
+    for value in ("1.5", "2.5", "WARNING:low"):
+        message = Message(*now, "online", "9", "voltage", value, "")
+        ground_system._handle_message(message)
+
+    # повтор getlog и служебные сообщения в агрегаты не входят
+    ground_system._handle_message(Message(*now, "log", "9", "voltage", "100", ""))
+    ground_system._handle_message(Message(*now, "log", "9", "system", "log_end", "", 1))
+    assert ground_system._stats.summary("9", "system", time.time()) is None
+    capsys.readouterr()
+
+    ground_system._handle_request(["stats", "9", "voltage"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == (
+        "60s: count=3 min=1.5 max=2.5 mean=2 failure_rate=0.333333 last=WARNING:low"
+    )
+    assert len(lines) == 3
+
+
+def test_metrics(ground_system):
+    line = "2025-08-26 13:28:40.1 online 2 voltage 1.656"
+    good = {"recv_time": 0, "message": f"{line} {calc_checksum(*line.split(' '))}"}
+    broken = {"recv_time": 0, "message": f"{line} 1"}
+
+    metrics = ground_system.metrics
+    received = metrics.get("received_messages_total").value
+    failures = metrics.get("checksum_failures_total").value
+    errors = metrics.get("json_decode_errors_total").value
+
+    ground_system._parse_datagram(json.dumps([good, broken]).encode())
+    ground_system._parse_datagram(b"{broken")
+
+    assert metrics.get("received_messages_total").value == received + 1
+    assert metrics.get("checksum_failures_total").value == failures + 1
+    assert metrics.get("json_decode_errors_total").value == errors + 1
+
+
+def test_json_sequence_gap_requests_resend(ground_system, mocker):
+    log_filename = "test_client_sputnik.log"
+    open(log_filename, "w").close()
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    sputnik = SputnikLogSystem(
+        "127.0.0.1", 5001, "127.0.0.1", 5002, log_filename=log_filename
+    )
+
+    resend = mocker.patch.object(ground_system, "_send_resend")
+    handle = mocker.patch.object(ground_system, "_handle_message")
+    ground_system._sequences.pop(LIVE_STREAM, None)
+    try:
+        msgs = [sputnik.generate_online_message() for _ in range(3)]
+        sputnik._enqueue(*msgs)
+        sputnik._fifo_queue.drain()
+
+        # формат по умолчанию json, датаграмма с seq 2 потерялась
+        for msg in (msgs[0], msgs[2]):
+            (datagram,) = sputnik._pack_datagrams([msg])
+            for message in ground_system._parse_datagram(datagram):
+                assert message.seq == msg["seq"]
+                ground_system._receive_msg(message)
+
+        # seq 3 ждет пропуск в буфере порядка
+        assert handle.call_count == 1
+
+        tracker = ground_system._sequences[LIVE_STREAM]
+        tracker._pending_since -= ground_system.reorder_timeout
+        ground_system._check_sequences()
+
+        resend.assert_called_once_with(None, [(2, 2)])
+    finally:
+        ground_system._sequences.pop(LIVE_STREAM, None)
+        sputnik.close()
+        for suffix in ("", ".index", ".manifest"):
+            if os.path.exists(log_filename + suffix):
+                os.remove(log_filename + suffix)
@@ -0,0 +1,59 @@
+import pytest
+
+from downlink_queue import LIVE, REPLAY, DownlinkQueue
+
+
+def test_live_before_replay():
+    queue = DownlinkQueue(maxlen=10)
+    queue.put_many(["r1", "r2"], REPLAY)
+    queue.put("l1", LIVE)
+    assert queue.drain() == ["l1", "r1", "r2"]
+
+
+def test_drop_oldest_prefers_replay():
+    queue = DownlinkQueue(maxlen=2, policy="drop-oldest")
+    queue.put("r1", REPLAY)
+    queue.put("l1", LIVE)
+    queue.put("l2", LIVE)
+
+    assert queue.drain() == ["l1", "l2"]
+    assert queue.stats()["dropped_replay"] == 1
+
+
+@pytest.mark.parametrize("policy", ["block", "pause-replay"])
+def test_replay_waits_for_space(policy):
+    queue = DownlinkQueue(maxlen=1, policy=policy)
+    queue.put("r1", REPLAY)
+
+    assert queue.put("r2", REPLAY, timeout=0.01) == False
+    assert queue.stats()["dropped_replay"] == 1
+    assert queue.drain() == ["r1"]
+
+
+def test_pause_replay_never_blocks_live():
+    queue = DownlinkQueue(maxlen=1, policy="pause-replay")
+    queue.put("l1", LIVE)
+    assert queue.put("l2", LIVE, timeout=0.01) == True
+
+    stats = queue.stats()
+    assert stats["dropped_live"] == 1
+    assert stats["max_depth"] == 1
+
+
+def test_on_ready_signals_empty_to_non_empty():
+    queue = DownlinkQueue(maxlen=10)
+    signals = []
+    queue.set_on_ready(lambda: signals.append(len(queue)))
+
+    queue.put_many([1, 2])
+    queue.put(3)
+    assert signals == [2]
+
+    queue.drain()
+    queue.put(4, priority=REPLAY)
+    assert signals == [2, 1]
+
+    queue.set_on_ready(None)
+    queue.drain()
+    queue.put(5)
+    assert signals == [2, 1]
@@ -0,0 +1,52 @@
+import json
+import socket
+import time
+
+from ground_pool import GroundPool, parse_address
+from server import SputnikLogSystem
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:5002") == ("127.0.0.1", 5002)
+    assert parse_address("5") is None
+
+
+def test_pool_routes_commands_by_spacecraft(tmp_path):
+    log_filename = str(tmp_path / "client.log")
+    pool = GroundPool(
+        "127.0.0.1",
+        5030,
+        workers=2,
+        log_filename=log_filename,
+        request_interval=0.05,
+    )
+    pool.start()
+
+    sputniks = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(2)]
+    try:
+        for port, sputnik in zip((5031, 5032), sputniks):
+            sputnik.bind(("127.0.0.1", port))
+            sputnik.settimeout(5)
+
+        addresses = {("127.0.0.1", 5031), ("127.0.0.1", 5032)}
+        deadline = time.monotonic() + 5
+        while set(pool.spacecraft()) != addresses and time.monotonic() < deadline:
+            for sputnik in sputniks:
+                message = SputnikLogSystem.generate_online_message()
+                sputnik.sendto(json.dumps(message).encode(), ("127.0.0.1", 5030))
+            time.sleep(0.05)
+        assert set(pool.spacecraft()) == addresses
+
+        # getlog уходит только аппарату, указанному в команде
+        assert pool.route(["127.0.0.1:5032", "5", "3", "temperature"])
+        request = json.loads(sputniks[1].recv(1024))
+        assert request["command"] == "getlog"
+        assert not pool.route(["127.0.0.1:5033", "5", "3", "temperature"])
+    finally:
+        pool.close()
+        for sputnik in sputniks:
+            sputnik.close()
+
+    for port in (5031, 5032):
+        with open(f"{log_filename}.127.0.0.1_{port}") as file:
+            assert "src=online" in file.read()
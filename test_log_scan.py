@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from binary_log import text_to_binary
+from log_scan import iter_file_lines, merge_lines, plan_scan, scan_part, split_plan
+
+START = datetime(2025, 8, 26, 13, 0, 0, 1)
+
+
+def _write_log(filename, count, offset=0):
+    lines = []
+    for i in range(count):
+        dtm = START + timedelta(seconds=2 * i + offset)
+        device, sensor = ("3", "temperature") if i % 3 else ("2", "voltage")
+        lines.append(f"{dtm} log {device} {sensor} {i}")
+
+    with open(filename, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    return lines
+
+
+@pytest.mark.parametrize("log_format", ["text", "binary"])
+@pytest.mark.parametrize("parts", [1, 3, 7, 50])
+def test_parts_cover_tail_once(tmp_path, log_format, parts):
+    filename = str(tmp_path / "server.log")
+    _write_log(filename, 200)
+    if log_format == "binary":
+        text_to_binary(filename, filename + ".bin")
+        filename += ".bin"
+
+    since = START + timedelta(seconds=101)
+    expected = list(iter_file_lines(filename, log_format, since, "3", "temperature"))
+
+    plan = plan_scan([filename], log_format, since)
+    results = [
+        scan_part(filename, log_format, since, "3", "temperature", start, stop)
+        for filename, start, stop in split_plan(plan, parts, log_format)
+    ]
+    assert len(results) <= parts
+    assert [line for result in results for line in result] == expected
+    assert len(expected) == 99
+
+
+def test_merge_by_time(tmp_path):
+    first = _write_log(str(tmp_path / "first.log"), 10)
+    second = _write_log(str(tmp_path / "second.log"), 10, offset=1)
+
+    assert list(merge_lines([first, second])) == sorted(first + second)
@@ -0,0 +1,55 @@
+import os
+
+from log_segments import SegmentManifest
+
+
+def _segment(tmp_path, manifest, name, records):
+    filename = str(tmp_path / name)
+    for device, sensor, timestamp in records:
+        manifest.add(device, sensor, timestamp)
+    open(filename, "w").close()
+    manifest.close_segment(filename)
+    return filename
+
+
+def test_find_by_time_and_pair(tmp_path):
+    manifest = SegmentManifest(str(tmp_path / "server.log"))
+    first = _segment(tmp_path, manifest, "first", [(3, "temperature", 100.0)])
+    second = _segment(
+        tmp_path, manifest, "second", [(3, "temperature", 200.0), (2, "voltage", 250.0)]
+    )
+
+    assert manifest.find("3", "temperature", 50.0) == [first, second]
+    assert manifest.find("3", "temperature", 100.0) == [second]
+    assert manifest.find("3", "temperature", 50.0, until=150.0) == [first]
+    assert manifest.find("2", "voltage", 0.0) == [second]
+    assert manifest.find("2", "current", 0.0) == []
+
+    # манифест переживает перезапуск
+    reloaded = SegmentManifest(str(tmp_path / "server.log"))
+    assert reloaded.find("2", "voltage", 0.0) == [second]
+
+
+def test_expire_removes_whole_segments(tmp_path):
+    manifest = SegmentManifest(str(tmp_path / "server.log"), sidecars=(".strings",))
+    first = _segment(tmp_path, manifest, "first", [(3, "temperature", 100.0)])
+    open(first + ".strings", "w").close()
+    second = _segment(tmp_path, manifest, "second", [(3, "temperature", 200.0)])
+
+    assert manifest.expire(150.0) == [first]
+    assert not os.path.exists(first) and not os.path.exists(first + ".strings")
+    assert os.path.exists(second)
+    reloaded = SegmentManifest(str(tmp_path / "server.log"))
+    assert reloaded.find("3", "temperature", 0.0) == [second]
+
+
+def test_unknown_records_match_any_pair(tmp_path):
+    log_filename = str(tmp_path / "server.log")
+    with open(log_filename, "w") as file:
+        file.write("записи предыдущего запуска\n")
+
+    manifest = SegmentManifest(log_filename)
+    os.rename(log_filename, log_filename + ".1")
+    manifest.close_segment(log_filename + ".1")
+
+    assert manifest.find("5", "pressure", 0.0) == [log_filename + ".1"]
@@ -0,0 +1,46 @@
+import os
+import time
+
+from log_writer import LogWriter
+
+
+def test_buffered_write_and_flush(tmp_path):
+    filename = str(tmp_path / "test.log")
+    writer = LogWriter(filename, flush_interval=60)
+
+    assert writer.write("first") == 0
+    assert writer.write("second") == len("first\n")
+    assert os.path.getsize(filename) == 0
+
+    writer.flush()
+    with open(filename) as file:
+        assert file.read() == "first\nsecond\n"
+    writer.close()
+
+
+def test_size_rotation(tmp_path):
+    filename = str(tmp_path / "test.log")
+    rotated = []
+    writer = LogWriter(filename, buffer_size=0, max_bytes=10, on_rotate=rotated.append)
+
+    writer.write("0123456789")
+    assert writer.write("next") == 0
+    writer.close()
+
+    assert len(rotated) == 1
+    with open(rotated[0]) as file:
+        assert file.read() == "0123456789\n"
+    with open(filename) as file:
+        assert file.read() == "next\n"
+
+
+def test_time_based_flush_without_writes(tmp_path):
+    filename = str(tmp_path / "test.log")
+    writer = LogWriter(filename, flush_interval=0.05)
+
+    writer.write("first")
+    time.sleep(0.3)
+    assert os.path.getsize(filename) == len("first\n")
+
+    writer.close()
+    writer.close()
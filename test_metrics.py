@@ -0,0 +1,60 @@
+import urllib.request
+
+import pytest
+
+from metrics import MetricsRegistry, MetricsServer
+
+
+def test_counter_and_gauge():
+    registry = MetricsRegistry("test_")
+    counter = registry.counter("events_total", "Events")
+    counter.inc()
+    counter.inc(4)
+
+    dropped = [0]
+    registry.counter("dropped_total", "Dropped", lambda: dropped[0])
+    dropped[0] = 2
+
+    depth = [3]
+    registry.gauge("depth", "Depth", lambda: depth[0])
+    depth[0] = 7
+
+    text = registry.render()
+    assert "# HELP test_events_total Events" in text
+    assert "# TYPE test_events_total counter" in text
+    assert "test_events_total 5" in text
+    assert "test_depth 7" in text
+    assert "# TYPE test_dropped_total counter" in text
+    assert "test_dropped_total 2" in text
+
+    with pytest.raises(ValueError):
+        registry.counter("events_total")
+
+
+def test_histogram_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+    # значения на границе попадают в интервал le=границы
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 2.65" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_metrics_server():
+    registry = MetricsRegistry()
+    registry.counter("requests_total").inc(2)
+
+    server = MetricsServer(registry).start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "requests_total 2" in response.read().decode()
+    finally:
+        server.close()
@@ -0,0 +1,44 @@
+import pytest
+
+from rolling_stats import RollingStats, RollingWindow
+
+
+def test_window_expires_old_buckets():
+    window = RollingWindow(10, buckets=10)
+    window.add(100.5, 1.0, False)
+    window.add(105.5, 3.0, False)
+    window.add(106.5, None, True)
+
+    assert window.summary(106.9) == {
+        "count": 3,
+        "min": 1.0,
+        "max": 3.0,
+        "mean": 2.0,
+        "failure_rate": pytest.approx(1 / 3),
+    }
+
+    # первая запись вышла из окна
+    summary = window.summary(111.0)
+    assert (summary["count"], summary["min"]) == (2, 3.0)
+
+    # ячейку первой записи занял новый интервал
+    window.add(120.2, 7.0, False)
+    window.add(100.7, 100.0, False)
+    assert window.summary(120.5)["max"] == 7.0
+
+
+def test_stats_by_pair():
+    stats = RollingStats(windows=(60, 3600), buckets=60)
+    stats.add("3", "temperature", 1000.0, "25", False)
+    stats.add("3", "temperature", 1030.0, "ERROR:sensor_fail", True)
+    stats.add("3", "temperature", 10.0, "5", False)
+
+    summary = stats.summary(3, "temperature", 1040.0)
+    assert summary[60.0]["count"] == 2
+    assert summary[60.0]["mean"] == 25.0
+    assert summary[3600.0]["mean"] == 15.0
+    assert summary[3600.0]["failure_rate"] == pytest.approx(1 / 3)
+    # последнее по времени записи, запоздавший повтор его не меняет
+    assert summary[60.0]["last"] == "ERROR:sensor_fail"
+
+    assert stats.summary("2", "voltage", 1040.0) is None
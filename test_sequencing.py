@@ -0,0 +1,60 @@
+from sequencing import RetransmitBuffer, SequenceTracker
+
+
+def test_reorder_and_duplicates():
+    tracker = SequenceTracker(1)
+
+    assert tracker.push(2, "b", 0.0) == ([], [])
+    assert tracker.push(1, "a", 0.0) == (["a", "b"], [])
+    assert tracker.push(2, "b", 0.0) == ([], [])
+    assert tracker.duplicates == 1
+    assert not tracker.has_missing()
+
+
+def test_gap_is_reported_and_filled_late():
+    tracker = SequenceTracker(1, timeout=0.2)
+    tracker.push(1, "a", 0.0)
+    tracker.push(4, "d", 0.0)
+
+    # пропуск еще может заполниться
+    assert tracker.expire(0.1) == ([], [])
+    assert tracker.expire(0.3) == (["d"], [(2, 3)])
+    assert tracker.missing_ranges() == [(2, 3)]
+
+    # дозапрошенное сообщение принимается вне очереди, но только один раз
+    assert tracker.push(3, "c", 0.4) == (["c"], [])
+    assert tracker.push(3, "c", 0.4) == ([], [])
+    assert tracker.missing_ranges() == [(2, 2)]
+    assert tracker.lost == 1
+
+
+def test_window_overflow_skips_gap():
+    tracker = SequenceTracker(1, window=2)
+    tracker.push(2, "b", 0.0)
+    tracker.push(3, "c", 0.0)
+
+    assert tracker.push(4, "d", 0.0) == (["b", "c", "d"], [(1, 1)])
+
+
+def test_sender_restart_resets_stream():
+    tracker = SequenceTracker(history=10)
+    tracker.push(100, "a", 0.0)
+
+    assert tracker.push(1, "b", 0.0) == (["b"], [])
+    assert tracker.next_seq == 2
+
+
+def test_retransmit_buffer():
+    retransmit = RetransmitBuffer(maxlen=3)
+    sent = retransmit.open(7)
+    for seq in range(1, 6):
+        retransmit.add(sent, {"seq": seq})
+
+    assert [msg["seq"] for msg in retransmit.get(7, 4)] == [4, 5]
+    assert [msg["seq"] for msg in retransmit.get(7, 1, 3)] == [3]
+    assert retransmit.get(8, 1) == []
+
+    # новый повтор того же потока не видит сообщений старого
+    retransmit.open(7)
+    retransmit.add(sent, {"seq": 6})
+    assert retransmit.get(7, 1) == []
@@ -1,6 +1,10 @@
 import pytest
 import json
 import os
+import threading
+import time
+
+from datetime import datetime, timedelta
 
 from message_types import RequestMessage
 from server import SputnikLogSystem
@@ -29,13 +33,28 @@ def test_gen_log(sputnik_system):
 
 def test_send_msg(sputnik_system, mocker):
     online = sputnik_system.generate_online_message()
-    sputnik_system._fifo_queue.append(online)
+    sputnik_system._fifo_queue.put(online)
 
     assert online.get("recv_time") is not None
     assert online.get("message") is not None
 
-    mocker.patch("socket.socket.sendto")
+    sendto = mocker.patch("socket.socket.sendto")
     sputnik_system._send_msg()
+    assert sendto.call_count == 1
+    assert len(sputnik_system._fifo_queue) == 0
+
+
+def test_send_msg_batches_up_to_mtu(sputnik_system, mocker):
+    for _ in range(50):
+        sputnik_system._fifo_queue.put(sputnik_system.generate_online_message())
+
+    sendto = mocker.patch("socket.socket.sendto")
+    sputnik_system._send_msg()
+
+    datagrams = [call.args[0] for call in sendto.call_args_list]
+    assert 1 < len(datagrams) < 50
+    assert all(len(datagram) <= sputnik_system.mtu for datagram in datagrams)
+    assert sum(len(json.loads(datagram)) for datagram in datagrams) == 50
 
 
 @pytest.mark.parametrize(
@@ -45,9 +64,10 @@ def test_send_msg(sputnik_system, mocker):
     ],
 )
 def test_receive_command(sputnik_system, mocker, command_json):
-    mocker.patch(
-        "socket.socket.recv",
-        lambda x, y: json.dumps(command_json).encode(),
+    mocker.patch.object(
+        sputnik_system._receiver,
+        "receive",
+        lambda: memoryview(json.dumps(command_json).encode()),
     )
     msg = sputnik_system._receive_command()
     assert isinstance(msg, RequestMessage) == True
@@ -55,4 +75,354 @@ def test_receive_command(sputnik_system, mocker, command_json):
     with open(sputnik_system.log_filename, "a") as file:
         file.write(sputnik_system.generate_log_message() + "\n")
 
-    sputnik_system._handle_command(msg)
+    sputnik_system._handle_command(msg).join()
+
+
+def test_handle_command_uses_index(sputnik_system):
+    for _ in range(3):
+        sputnik_system._save_msg(sputnik_system.generate_log_message())
+
+    sputnik_system._handle_command(
+        RequestMessage("getlog", "10", "3", "temperature")
+    ).join()
+    # log_start + 3 записи + log_end
+    assert len(sputnik_system._fifo_queue) == 5
+
+    sputnik_system._fifo_queue.drain()
+    sputnik_system._handle_command(
+        RequestMessage("getlog", "10", "2", "temperature")
+    ).join()
+    assert len(sputnik_system._fifo_queue) == 0
+
+
+def test_handle_command_tail_scan(mocker):
+    log_filename = "test_server_tail.log"
+    with open(log_filename, "w") as file:
+        file.write("2000-01-01 00:00:00.000001 log 3 temperature 10\n")
+
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    sputnik = SputnikLogSystem(
+        "127.0.0.1", 5001, "127.0.0.1", 5002, log_filename=log_filename, use_index=False
+    )
+    for _ in range(2):
+        sputnik._save_msg(sputnik.generate_log_message())
+
+    sputnik._handle_command(RequestMessage("getlog", "10", "3", "temperature")).join()
+    os.remove(log_filename)
+
+    # старая запись не попала в интервал
+    assert len(sputnik._fifo_queue) == 4
+
+
+def test_async_replay_is_bounded(mocker):
+    import asyncio
+    from async_server import AsyncSputnikLogSystem
+
+    log_filename = "test_server_async.log"
+    open(log_filename, "w").close()
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    sputnik = AsyncSputnikLogSystem(
+        "127.0.0.1", 5001, "127.0.0.1", 5002, log_filename=log_filename, queue_maxlen=2
+    )
+    for _ in range(5):
+        sputnik._save_msg(sputnik.generate_log_message())
+
+    sent = []
+
+    async def handle():
+        sputnik._loop = asyncio.get_running_loop()
+        sputnik._transport = mocker.Mock()
+        sputnik._pack_datagrams = lambda msgs: sent.extend(msgs) or []
+        sender = asyncio.ensure_future(sputnik._sender())
+
+        req_msg = RequestMessage("getlog", "10", "3", "temperature")
+        replay_thr = await sputnik._loop.run_in_executor(
+            None, sputnik._handle_command, req_msg
+        )
+        await sputnik._loop.run_in_executor(None, replay_thr.join)
+        while len(sputnik._fifo_queue):
+            await asyncio.sleep(0.01)
+        sender.cancel()
+
+    asyncio.run(handle())
+    os.remove(log_filename)
+
+    # log_start + 5 записей + log_end прошли через очередь на 2 сообщения
+    assert len(sent) == 7
+    assert sputnik._fifo_queue.stats()["max_depth"] <= 2
+    assert sputnik._fifo_queue.stats()["dropped_replay"] == 0
+
+
+def test_handle_command_binary_log(mocker, tmp_path):
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    sputnik = SputnikLogSystem(
+        "127.0.0.1",
+        5001,
+        "127.0.0.1",
+        5002,
+        log_filename=str(tmp_path / "test_server.blog"),
+        log_format="binary",
+    )
+    logs = [sputnik.generate_log_message() for _ in range(3)]
+    for log in logs:
+        sputnik._save_msg(log)
+
+    sputnik._handle_command(RequestMessage("getlog", "10", "3", "temperature")).join()
+    replayed = [msg["message"] for msg in sputnik._fifo_queue.drain()[1:-1]]
+    assert [msg.rsplit(" ", 1)[0] for msg in replayed] == logs
+
+
+def test_newer_command_cancels_replay(sputnik_system):
+    for _ in range(5):
+        sputnik_system._save_msg(sputnik_system.generate_log_message())
+    sputnik_system.replay_rate = 10
+
+    req_msg = RequestMessage("getlog", "10", "3", "temperature")
+    first = sputnik_system._handle_command(req_msg)
+    second = sputnik_system._handle_command(req_msg)
+    first.join()
+    second.join()
+
+    messages = [msg["message"] for msg in sputnik_system._fifo_queue.drain()]
+    assert sum("log_start" in message for message in messages) <= 2
+    assert sum("log_end" in message for message in messages) == 1
+
+
+def test_replay_echoes_request_id(sputnik_system):
+    req_msg = RequestMessage("getlog", "10", "3", "temperature", 42)
+    sputnik_system._handle_command(req_msg).join()
+
+    # пустой результат все равно обрамлен log_start/log_end
+    msgs = sputnik_system._fifo_queue.drain()
+    assert [msg["message"].split(" ")[5] for msg in msgs] == ["log_start", "log_end"]
+    assert all(msg["request_id"] == 42 for msg in msgs)
+
+
+def test_replay_skips_unflushed_records(sputnik_system):
+    sputnik_system._log_writer.flush_interval = 60
+    sputnik_system._save_msg(sputnik_system.generate_log_message())
+
+    req_msg = RequestMessage("getlog", "10", "3", "temperature", 1)
+    flush = sputnik_system._log_writer.flush
+
+    def flush_then_write():
+        # запись появилась в индексе сразу после сброса, но лежит в буфере
+        flushed = flush()
+        sputnik_system._save_msg(sputnik_system.generate_log_message())
+        return flushed
+
+    sputnik_system._log_writer.flush = flush_then_write
+    msgs = list(sputnik_system._iter_replay(req_msg, threading.Event()))
+
+    values = [msg["message"].split(" ")[5] for msg in msgs]
+    assert values[0] == "log_start" and values[-1] == "log_end"
+    assert len(msgs) == 3
+
+
+def test_binary_log_rotation_keeps_strings(mocker, tmp_path):
+    from binary_log import RECORD, binary_to_text
+
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    sputnik = SputnikLogSystem(
+        "127.0.0.1",
+        5001,
+        "127.0.0.1",
+        5002,
+        log_filename=str(tmp_path / "test_server.blog"),
+        log_format="binary",
+        log_max_bytes=RECORD.size,
+    )
+    log = sputnik.generate_log_message()
+    sputnik._save_msg(log)
+    sputnik._save_msg(sputnik.generate_log_message())
+    sputnik.close()
+
+    (rotated,) = [
+        path
+        for path in tmp_path.iterdir()
+        if path.name.startswith("test_server.blog.")
+        and path.suffix not in (".strings", ".manifest")
+    ]
+    binary_to_text(str(rotated), str(tmp_path / "rotated.log"))
+    assert (tmp_path / "rotated.log").read_text() == log + "\n"
+
+
+def test_resend_serves_missing_seq(sputnik_system):
+    req_msg = RequestMessage("getlog", "10", "3", "temperature", 42)
+    sputnik_system._handle_command(req_msg).join()
+    assert [msg["seq"] for msg in sputnik_system._fifo_queue.drain()] == [1, 2]
+
+    for _ in range(3):
+        sputnik_system._enqueue(sputnik_system.generate_online_message())
+    assert [msg["seq"] for msg in sputnik_system._fifo_queue.drain()] == [1, 2, 3]
+
+    resend = sputnik_system._parse_command(
+        json.dumps(
+            {"command": "resend", "request_id": 42, "ranges": [[2, None]]}
+        ).encode()
+    )
+    sputnik_system._handle_command(resend).join()
+    live_resend = sputnik_system._parse_command(
+        json.dumps({"command": "resend", "ranges": [[1, 2]]}).encode()
+    )
+    sputnik_system._handle_command(live_resend).join()
+
+    msgs = sputnik_system._fifo_queue.drain()
+    assert [(msg.get("request_id"), msg["seq"]) for msg in msgs] == [
+        (42, 2),
+        (None, 1),
+        (None, 2),
+    ]
+
+
+def test_zlib_replay_encoding(mocker, tmp_path):
+    from client import GroundLogSystem
+
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    sputnik = SputnikLogSystem(
+        "127.0.0.1",
+        5001,
+        "127.0.0.1",
+        5002,
+        log_filename=str(tmp_path / "test_server.log"),
+        replay_encoding="zlib",
+    )
+    logs = [sputnik.generate_log_message() for _ in range(100)]
+    for log in logs:
+        sputnik._save_msg(log)
+    sputnik._enqueue(sputnik.generate_online_message())
+    req_msg = RequestMessage("getlog", "10", "3", "temperature", 5)
+    sputnik._handle_command(req_msg).join()
+
+    datagrams = sputnik._pack_datagrams(sputnik._fifo_queue.drain())
+    # живая телеметрия, log_start, одна пачка записей и log_end
+    assert len(datagrams) == 4
+
+    ground = GroundLogSystem(
+        "127.0.0.1", 5010, "127.0.0.1", 5020, log_filename=str(tmp_path / "client.log")
+    )
+    messages = [msg for data in datagrams for msg in ground._parse_datagram(data)]
+    ground.close()
+
+    assert [msg.source for msg in messages] == ["online"] + ["log"] * 102
+    assert [" ".join(msg[:6]) for msg in messages[2:-1]] == logs
+    assert [msg.seq for msg in messages[1:]] == list(range(1, 103))
+
+
+def test_getlog_reads_overlapping_segments(mocker, tmp_path):
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    log_filename = str(tmp_path / "test_server.log")
+    sputnik = SputnikLogSystem(
+        "127.0.0.1",
+        5001,
+        "127.0.0.1",
+        5002,
+        log_filename=log_filename,
+        log_max_bytes=1,
+        log_retention=60,
+    )
+    now = datetime.now()
+    old = now - timedelta(seconds=120)
+
+    # каждая запись закрывает предыдущий сегмент
+    sputnik._save_msg(f"{old.date()} {old.time()} log 3 temperature 1")
+    sputnik._save_msg(f"{now.date()} {now.time()} log 3 temperature 2")
+    sputnik._save_msg(f"{now.date()} {now.time()} log 2 voltage 3")
+    sputnik._save_msg(f"{now.date()} {now.time()} log 3 temperature 4")
+
+    # сегмент с записью двухминутной давности удален по log_retention
+    segments = sputnik._log_segments.find("3", "temperature", 0.0)
+    assert len(segments) == 1
+    assert all(os.path.exists(segment) for segment in segments)
+
+    opened = mocker.spy(sputnik, "_iter_file_lines")
+    req_msg = RequestMessage("getlog", "10", "3", "temperature")
+    flushed = sputnik._log_writer.flush()
+    lines = list(
+        sputnik._iter_log_lines(req_msg, now - timedelta(seconds=10), flushed)
+    )
+    sputnik.close()
+
+    assert [line.split(" ")[5] for line in lines] == ["2", "4"]
+    # сегмент только с voltage не открывался
+    assert [call.args[0] for call in opened.call_args_list] == segments
+
+
+def test_getlog_parallel_scan(mocker, tmp_path):
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+    sputnik = SputnikLogSystem(
+        "127.0.0.1",
+        5001,
+        "127.0.0.1",
+        5002,
+        log_filename=str(tmp_path / "test_server.log"),
+        use_index=False,
+        log_max_bytes=4096,
+        scan_workers=2,
+        scan_threshold=1,
+    )
+    for _ in range(300):
+        sputnik._save_msg(sputnik.generate_log_message())
+    sputnik._log_writer.flush()
+
+    req_msg = RequestMessage("getlog", "10", "3", "temperature")
+    since = datetime.now() - timedelta(seconds=10)
+    scan = mocker.spy(sputnik, "_scan_parallel")
+    lines = list(sputnik._iter_log_lines(req_msg, since))
+
+    assert scan.call_count == 1
+    sputnik.scan_workers = 0
+    assert lines == list(sputnik._iter_log_lines(req_msg, since))
+    assert len(lines) == 300
+    sputnik.close()
+
+
+def test_producer_independent_of_commands(mocker):
+    log_filename = "test_producer.log"
+    open(log_filename, "w").close()
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+
+    sputnik = SputnikLogSystem(
+        "127.0.0.1", 5001, "127.0.0.1", 5002, log_filename=log_filename, tick=0.01
+    )
+    generate = mocker.spy(sputnik, "_generate_telemetry")
+    try:
+        # прием команд не запущен, генерация идет по своему расписанию
+        sputnik._producer_thr.start()
+        time.sleep(0.2)
+    finally:
+        sputnik.close()
+        for suffix in ("", ".index", ".manifest"):
+            if os.path.exists(log_filename + suffix):
+                os.remove(log_filename + suffix)
+
+    assert not sputnik._producer_thr.is_alive()
+    assert generate.call_count >= 10
+    # последний тик прерван остановкой
+    assert generate.call_count == sputnik._ticker.ticks - 1
+
+
+def test_metrics(sputnik_system, mocker):
+    for _ in range(3):
+        sputnik_system._save_msg(sputnik_system.generate_log_message())
+    sputnik_system._handle_command(
+        RequestMessage("getlog", "10", "3", "temperature")
+    ).join()
+    assert sputnik_system._parse_command(b"{broken") is None
+
+    metrics = sputnik_system.metrics
+    assert metrics.get("queue_depth").value == 5
+    assert metrics.get("queue_dropped_total").type == "counter"
+    assert metrics.get("queue_dropped_total").value == 0
+    assert metrics.get("log_records_total").value == 3
+    assert metrics.get("commands_total").value == 1
+    assert metrics.get("getlog_records_total").value == 5
+    assert metrics.get("getlog_seconds").count == 1
+    assert metrics.get("json_decode_errors_total").value == 1
+
+    mocker.patch("socket.socket.sendto")
+    sputnik_system._send_msg()
+    assert metrics.get("queue_depth").value == 0
+    assert metrics.get("sent_messages_total").value == 5
+    assert metrics.get("sent_datagrams_total").value >= 1
+    assert "sputnik_sent_messages_total 5" in metrics.render()
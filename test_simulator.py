@@ -0,0 +1,104 @@
+import os
+
+from datetime import datetime
+
+import pytest
+
+from server import SputnikLogSystem
+from simulator import FleetSimulator
+from tools import verify_checksums
+
+
+@pytest.fixture
+def simulator():
+    return FleetSimulator(
+        devices=200,
+        sensors=("temperature", "voltage"),
+        rate=5.0,
+        online_fraction=0.2,
+        seed=1,
+    )
+
+
+def test_generate_counts(simulator):
+    logs, messages = simulator.generate(datetime(2024, 1, 1, 12), 1.0)
+
+    # 400 пар по 5 записей в секунду в среднем
+    assert 1800 < len(logs) < 2200
+    assert simulator.generated == len(logs)
+    assert 0.15 < len(messages) / len(logs) < 0.25
+
+    devices = {log.split(" ")[3] for log in logs}
+    sensors = {log.split(" ")[4] for log in logs}
+    assert len(devices) == 200
+    assert sensors == {"temperature", "voltage"}
+
+
+def test_generate_time_ordered(simulator):
+    now = datetime(2024, 1, 1, 12)
+    logs, _ = simulator.generate(now, 2.0)
+
+    times = [datetime.fromisoformat(" ".join(log.split(" ")[:2])) for log in logs]
+    assert times == sorted(times)
+    assert all(0 <= (now - time).total_seconds() <= 2.0 for time in times)
+
+
+def test_generate_failures():
+    simulator = FleetSimulator(
+        devices=1000,
+        sensors=("temperature",),
+        rate=10.0,
+        failure_probability=0.1,
+        warning_probability=0.2,
+        seed=2,
+    )
+    logs, _ = simulator.generate(datetime(2024, 1, 1, 12), 1.0)
+
+    values = [log.split(" ")[5] for log in logs]
+    errors = values.count("ERROR:sensor_fail") / len(values)
+    warnings = values.count("WARNING:overheat") / len(values)
+    assert 0.08 < errors < 0.12
+    assert 0.18 < warnings < 0.22
+    numbers = [float(value) for value in values if value[0].isdigit()]
+    assert all(0 <= number <= 50 for number in numbers)
+
+
+@pytest.mark.parametrize("checksum_mode", ["sum", "crc32"])
+def test_tick_checksums(simulator, checksum_mode):
+    simulator._last_tick -= 1.0
+    _, messages = simulator.tick(checksum_mode)
+
+    assert messages
+    assert all(verify_checksums([message["message"] for message in messages]))
+    assert all(message["message"].split(" ")[2] == "online" for message in messages)
+
+
+def test_generate_telemetry(simulator, mocker):
+    log_filename = "test_simulator.log"
+    open(log_filename, "w").close()
+    mocker.patch("socket.socket.bind", lambda x, y: None)
+
+    sputnik = SputnikLogSystem(
+        "127.0.0.1",
+        5001,
+        "127.0.0.1",
+        5002,
+        log_filename=log_filename,
+        simulator=simulator,
+    )
+    try:
+        simulator._last_tick -= 1.0
+        sputnik._generate_telemetry()
+        sputnik._log_writer.flush()
+
+        with open(log_filename) as file:
+            assert sum(1 for _ in file) == simulator.generated
+
+        queued = sputnik._fifo_queue.drain()
+        assert queued
+        assert [msg["seq"] for msg in queued] == list(range(1, len(queued) + 1))
+    finally:
+        sputnik.close()
+        for suffix in ("", ".index", ".manifest"):
+            if os.path.exists(log_filename + suffix):
+                os.remove(log_filename + suffix)
@@ -0,0 +1,48 @@
+import pytest
+
+from ticker import FixedRateTicker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ticker_fixed_rate():
+    clock = FakeClock()
+    ticker = FixedRateTicker(1.0, clock)
+
+    # первый тик сразу, дальше по расписанию start + k * period
+    assert ticker.delay() == 0.0
+    clock.now += 0.3
+    assert ticker.delay() == pytest.approx(0.7)
+
+    # работа тика не сдвигает расписание
+    clock.now = 101.4
+    assert ticker.delay() == pytest.approx(0.6)
+    assert ticker.missed == 0
+    assert ticker.ticks == 3
+
+
+def test_ticker_missed_ticks():
+    clock = FakeClock()
+    ticker = FixedRateTicker(0.5, clock)
+    ticker.delay()
+
+    # тики 1 (100.5) и 2 (101.0) просрочены: 1 пропущен, 2 выполняется с опозданием
+    clock.now = 101.2
+    assert ticker.delay() == 0.0
+    assert ticker.missed == 1
+    assert ticker.max_lag == pytest.approx(0.2)
+
+    # следующий тик 3 по расписанию в 101.5
+    assert ticker.delay() == pytest.approx(0.3)
+    assert ticker.missed == 1
+
+
+def test_ticker_period():
+    with pytest.raises(ValueError):
+        FixedRateTicker(0)
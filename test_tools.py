@@ -0,0 +1,33 @@
+import pytest
+
+from tools import (
+    CHECKSUM_BATCH_MIN,
+    calc_checksum,
+    calc_checksums,
+    calc_line_checksum,
+    make_checksum,
+    verify_checksums,
+)
+
+LINE = "2025-08-26 13:33:32.321327 online 2 voltage 9.123"
+
+
+def test_line_checksum_matches_fields():
+    assert calc_line_checksum(LINE) == calc_checksum(*LINE.split(" ")) == 2972
+
+
+@pytest.mark.parametrize("repeat", [1, CHECKSUM_BATCH_MIN])
+def test_batch_checksums(repeat):
+    # пустые строки в середине и в конце пачки, короткие - по одной, длинные - векторно
+    lines = [LINE, "", "2025-08-26 13:28:40 log 3 temperature 25"] * repeat + [""]
+    assert calc_checksums(lines) == [calc_line_checksum(line) for line in lines]
+
+
+@pytest.mark.parametrize("mode", ["sum", "crc32"])
+def test_verify_checksums(mode):
+    checksum = make_checksum(LINE.split(" "), mode)
+    reordered = "2025-08-26 13:33:32.321327 online 2 voltage 9.132"
+    assert verify_checksums([f"{LINE} {checksum}", f"{reordered} {checksum}"]) == [
+        True,
+        mode == "sum",
+    ]
@@ -0,0 +1,126 @@
+import json
+import zlib
+
+from datetime import datetime
+
+from binary_log import to_epoch_us
+from message_types import Message
+from wire import (
+    CHECKSUM,
+    HEADER,
+    MAGIC,
+    RECORD_V1,
+    decode_datagram,
+    is_binary,
+    pack_batch_datagrams,
+    pack_binary_datagrams,
+)
+
+MSGS = [
+    {
+        "recv_time": 1756204412,
+        "message": "2025-08-26 13:33:32.321327 online 2 voltage 9.123 2972",
+    },
+    {
+        "recv_time": 1756204412,
+        "message": "2025-08-26 13:33:32.321327 log 3 system log_end 3058",
+        "request_id": 7,
+    },
+]
+
+
+def test_roundtrip():
+    (datagram,) = pack_binary_datagrams(MSGS, 1024)
+    assert is_binary(datagram)
+
+    messages = decode_datagram(datagram)
+    assert [message[:6] for message in messages] == [
+        tuple(msg["message"].split(" ")[:6]) for msg in MSGS
+    ]
+    assert [message.request_id for message in messages] == [None, 7]
+    assert all(isinstance(message, Message) for message in messages)
+
+
+def test_broken_record_is_skipped():
+    (datagram,) = pack_binary_datagrams(MSGS, 1024)
+    broken = bytearray(datagram)
+    broken[HEADER.size + 20] ^= 0xFF
+
+    assert len(decode_datagram(bytes(broken))) == 1
+
+
+def test_split_by_mtu():
+    datagrams = pack_binary_datagrams(MSGS * 50, 512)
+    assert all(len(datagram) <= 512 for datagram in datagrams)
+    assert sum(len(decode_datagram(datagram)) for datagram in datagrams) == 100
+
+
+def test_seq_roundtrip_and_v1():
+    (datagram,) = pack_binary_datagrams([{**MSGS[1], "seq": 3}], 1024)
+    assert decode_datagram(datagram)[0].seq == 3
+
+    # датаграмма версии 1 без seq
+    msg = MSGS[1]
+    dt, tm, src, device, sensor, value = msg["message"].split(" ")[:6]
+    record = RECORD_V1.pack(
+        msg["recv_time"],
+        to_epoch_us(datetime.fromisoformat(dt + "T" + tm)),
+        int(device),
+        msg["request_id"],
+        len(src),
+        len(sensor),
+        len(value),
+    ) + (src + sensor + value).encode()
+    record += CHECKSUM.pack(zlib.crc32(record))
+    (message,) = decode_datagram(HEADER.pack(MAGIC, 1, 0, 1) + record)
+
+    assert message[:6] == (dt, tm, src, device, sensor, value)
+    assert (message.request_id, message.seq) == (7, None)
+
+
+def test_batch_roundtrip():
+    msgs = [
+        {
+            "recv_time": 1756204412,
+            "message": f"2025-08-26 13:33:{i // 10:02}.{i % 10}00000 log 3 t {i} 0",
+            "request_id": 7,
+            "seq": i + 2,
+        }
+        for i in range(300)
+    ]
+    msgs.append({**MSGS[1], "seq": 302})
+
+    datagrams = pack_batch_datagrams(msgs, 512)
+    assert all(is_binary(datagram) and len(datagram) <= 512 for datagram in datagrams)
+    assert sum(map(len, datagrams)) < sum(map(len, pack_binary_datagrams(msgs, 512)))
+
+    messages = [m for datagram in datagrams for m in decode_datagram(datagram)]
+    assert [message[:6] for message in messages] == [
+        tuple(msg["message"].split(" ")[:6]) for msg in msgs
+    ]
+    assert [message.seq for message in messages] == list(range(2, 303))
+    assert {message.request_id for message in messages} == {7}
+
+
+def test_broken_batch_is_skipped():
+    (datagram,) = pack_batch_datagrams(MSGS[1:], 1024)
+    broken = bytearray(datagram)
+    broken[-1] ^= 0xFF
+
+    assert decode_datagram(bytes(broken)) == []
+
+
+def test_oversized_field_falls_back_to_json():
+    oversized = {
+        "recv_time": 1756204412,
+        "message": f"2025-08-26 13:33:32.321327 log 3 t {'9' * 300} 0",
+        "request_id": 7,
+        "seq": 4,
+    }
+
+    for pack in (pack_binary_datagrams, pack_batch_datagrams):
+        *binary, fallback = pack([*MSGS, oversized], 1024)
+        assert all(is_binary(datagram) for datagram in binary)
+        assert sum(len(decode_datagram(datagram)) for datagram in binary) == 2
+        assert not is_binary(fallback)
+        assert json.loads(fallback) == [oversized]
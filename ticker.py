@@ -0,0 +1,46 @@
+import time
+
+
+class FixedRateTicker:
+    def __init__(self, period: float, clock=time.monotonic):
+        """Расписание с фиксированным темпом по монотонным часам.
+
+        Тик k назначен на start + k * period, поэтому время работы между
+        тиками не накапливается в сдвиг. Если вызывающий опоздал на период
+        и больше, пропущенные тики не догоняются пачкой, а учитываются
+        в missed, и расписание продолжается со следующего тика в будущем.
+        """
+
+        if period <= 0:
+            raise ValueError("Ticker period must be positive")
+
+        self.period = float(period)
+        self._clock = clock
+        self._start = None
+        self._index = 0
+
+        self.ticks = 0
+        self.missed = 0
+        # наибольшее опоздание тика относительно расписания, сек
+        self.max_lag = 0.0
+
+    def delay(self) -> float:
+        """Секунды до следующего тика; тик считается выполненным после ожидания"""
+
+        now = self._clock()
+        if self._start is None:
+            self._start = now
+
+        deadline = self._start + self._index * self.period
+        lag = now - deadline
+        if lag >= self.period:
+            missed = int(lag // self.period)
+            self.missed += missed
+            self._index += missed
+            deadline += missed * self.period
+            lag -= missed * self.period
+        self.max_lag = max(self.max_lag, lag)
+
+        self._index += 1
+        self.ticks += 1
+        return max(deadline - now, 0.0)
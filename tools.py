@@ -1,6 +1,146 @@
+import json
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHECKSUM_MODES = ("sum", "crc32")
+CRC32_PREFIX = "crc32:"
+
+_SPACE = ord(" ")
+
+
 def calc_checksum(*fields):
-    res = 0
-    for item in fields:
-        for i in item.encode("ascii"):
-            res += int(i)
-    return res
+    """Аддитивная контрольная сумма: сумма байт всех полей"""
+
+    return sum("".join(fields).encode("ascii"))
+
+
+def calc_line_checksum(line: str) -> int:
+    """То же, что calc_checksum(*line.split(" ")), но без разбиения строки"""
+
+    return sum(line.encode("ascii")) - _SPACE * line.count(" ")
+
+
+# меньше этого числа строк (например одна датаграмма) суммы по одной
+# быстрее: подготовка буферов NumPy стоит дороже самого подсчета
+CHECKSUM_BATCH_MIN = 64
+
+
+def calc_checksums(lines) -> list[int]:
+    """Контрольные суммы сразу для многих строк.
+
+    Начиная с CHECKSUM_BATCH_MIN строк и при наличии NumPy строки
+    склеиваются в один буфер и суммируются векторно по сегментам,
+    иначе считаются по одной.
+    """
+
+    lines = list(lines)
+    if np is None or len(lines) < CHECKSUM_BATCH_MIN:
+        return [calc_line_checksum(line) for line in lines]
+
+    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    data = np.frombuffer("".join(lines).encode("ascii"), dtype=np.uint8)
+    starts = np.cumsum(lengths) - lengths
+    non_empty = lengths > 0
+
+    # сумма байт сегмента минус пробелы-разделители, которые в сумму не входят
+    sums = np.zeros(len(lines), dtype=np.int64)
+    if data.size:
+        starts = starts[non_empty]
+        sums[non_empty] = np.add.reduceat(data, starts, dtype=np.int64) - _SPACE * (
+            np.add.reduceat(data == _SPACE, starts, dtype=np.int64)
+        )
+    return sums.tolist()
+
+
+def calc_crc32(*fields) -> int:
+    """CRC32 полей через пробел, в отличие от суммы байт учитывает их порядок"""
+
+    return zlib.crc32(" ".join(fields).encode("ascii"))
+
+
+def make_checksum(fields, mode="sum") -> str:
+    """Поле контрольной суммы сообщения в режиме "sum" или "crc32".
+
+    Режим выбирается для каждого сообщения отдельно и определяется
+    получателем по префиксу поля.
+    """
+
+    if mode == "crc32":
+        return f"{CRC32_PREFIX}{calc_crc32(*fields):08x}"
+    if mode == "sum":
+        return str(calc_checksum(*fields))
+    raise ValueError(f"Unknown checksum mode: {mode}")
+
+
+def verify_checksum(fields, checksum) -> bool:
+    checksum = str(checksum)
+    if checksum.startswith(CRC32_PREFIX):
+        return checksum == make_checksum(fields, "crc32")
+
+    try:
+        return int(checksum) == calc_checksum(*fields)
+    except ValueError:
+        return False
+
+
+def verify_checksums(lines) -> list[bool]:
+    """Проверка строк сообщений "<поля> <контрольная сумма>" пачкой.
+
+    Аддитивные суммы считаются векторно через calc_checksums, CRC32 - по одной.
+    """
+
+    results = [False] * len(lines)
+    sum_positions = []
+    sum_bodies = []
+    sum_checksums = []
+
+    for i, line in enumerate(lines):
+        body, _, checksum = line.rpartition(" ")
+        if checksum.startswith(CRC32_PREFIX):
+            results[i] = verify_checksum(body.split(" "), checksum)
+        elif checksum.isdigit():
+            sum_positions.append(i)
+            sum_bodies.append(body)
+            sum_checksums.append(int(checksum))
+
+    for i, expected, actual in zip(
+        sum_positions, sum_checksums, calc_checksums(sum_bodies)
+    ):
+        results[i] = expected == actual
+
+    return results
+
+
+# максимальный размер датаграммы, должен совпадать на обеих сторонах
+DEFAULT_MTU = 1024
+
+
+def pack_datagrams(msgs, mtu=DEFAULT_MTU):
+    """Упаковывает сообщения в JSON-массивы, каждый не больше mtu байт.
+
+    Сообщение, которое само по себе больше mtu, отправляется отдельно.
+    """
+
+    datagrams = []
+    batch = []
+    size = 2  # "[" и "]"
+    for msg in msgs:
+        encoded = json.dumps(msg).encode()
+        # элементы массива разделяются ", "
+        new_size = size + len(encoded) + (2 if batch else 0)
+        if batch and new_size > mtu:
+            datagrams.append(b"[" + b", ".join(batch) + b"]")
+            batch = []
+            new_size = 2 + len(encoded)
+
+        batch.append(encoded)
+        size = new_size
+
+    if batch:
+        datagrams.append(b"[" + b", ".join(batch) + b"]")
+
+    return datagrams
@@ -0,0 +1,86 @@
+import socket
+import struct
+import sys
+
+from tools import DEFAULT_MTU
+
+# Linux сообщает количество отброшенных ядром датаграмм в служебных данных recvmsg
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40 if sys.platform == "linux" else None)
+
+_DROP_COUNTER = struct.Struct("I")
+
+
+class DatagramReceiver:
+    def __init__(self, sock, buffer_size=DEFAULT_MTU, buffer_count=64, rcvbuf=None):
+        """Прием датаграмм в заранее выделенные буферы.
+
+        receive() - одна датаграмма (блокирующий вызов с таймаутом сокета),
+        drain() - все датаграммы из очереди сокета за один проход; сокет для
+        drain() должен быть неблокирующим. Возвращаемые memoryview указывают
+        на буферы пула и действительны до следующего вызова, адреса
+        отправителей в том же порядке лежат в addresses.
+        """
+
+        self._sock = sock
+        self.buffer_count = int(buffer_count)
+        self._buffers = [
+            memoryview(bytearray(buffer_size)) for _ in range(self.buffer_count)
+        ]
+        self._single_buffer = memoryview(bytearray(buffer_size))
+        self.addresses = []
+
+        # запас буфера ядра на случай пачки датаграмм (например повтора getlog)
+        if rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(rcvbuf))
+        self.rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+        self._track_drops = False
+        if SO_RXQ_OVFL is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                self._track_drops = True
+            except OSError:
+                pass
+        self._ancbufsize = socket.CMSG_SPACE(_DROP_COUNTER.size)
+
+        # счетчик отброшенных ядром датаграмм (None - ОС его не сообщает)
+        self.kernel_dropped = 0 if self._track_drops else None
+        self.received = 0
+
+    def _recv_into(self, buffer) -> tuple[int, tuple]:
+        if not self._track_drops:
+            return self._sock.recvfrom_into(buffer)
+
+        nbytes, ancdata, _, address = self._sock.recvmsg_into(
+            [buffer], self._ancbufsize
+        )
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                (self.kernel_dropped,) = _DROP_COUNTER.unpack_from(data)
+        return nbytes, address
+
+    def receive(self) -> memoryview:
+        nbytes, address = self._recv_into(self._single_buffer)
+        self.addresses = [address]
+        self.received += 1
+        return self._single_buffer[:nbytes]
+
+    def drain(self) -> list[memoryview]:
+        datagrams = []
+        self.addresses = []
+        while len(datagrams) < self.buffer_count:
+            buffer = self._buffers[len(datagrams)]
+            try:
+                nbytes, address = self._recv_into(buffer)
+            except BlockingIOError:
+                break
+            except ConnectionError as e:
+                # ошибка ICMP от прошлой отправки, уже принятые датаграммы не теряем
+                print(e)
+                continue
+
+            datagrams.append(buffer[:nbytes])
+            self.addresses.append(address)
+
+        self.received += len(datagrams)
+        return datagrams
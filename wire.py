@@ -0,0 +1,346 @@
+import struct
+import zlib
+
+from datetime import datetime
+
+from binary_log import from_epoch_us, to_epoch_us
+from message_types import Message
+from tools import pack_datagrams
+
+# первый байт датаграммы: JSON всегда начинается с "{" или "[",
+# поэтому по нему получатель определяет формат
+MAGIC = 0xA5
+VERSION = 2
+
+# magic, версия, флаги, количество записей
+HEADER = struct.Struct("<BBBH")
+# recv_time, время записи (мкс), device, request_id (0 - нет), seq (0 - нет),
+# длины source, sensor и value
+RECORD = struct.Struct("<qqIIIBBB")
+# версия 1 без seq, принимается от еще не обновленных отправителей
+RECORD_V1 = struct.Struct("<qqIIBBB")
+CHECKSUM = struct.Struct("<I")
+
+# флаг пачки: записи одной пары (device, sensor) сжаты zlib одним блоком,
+# после блока CRC32 несжатых данных
+FLAG_BATCH = 0x01
+# recv_time, время первой записи (мкс), device, request_id (0 - нет),
+# seq первой записи (0 - нет), длины source и sensor
+BATCH = struct.Struct("<qqIIIBB")
+# смещение времени от предыдущей записи (мкс) и длина value
+BATCH_RECORD = struct.Struct("<iB")
+_BATCH_DELTA_MAX = 2**31 - 1
+# длины source, sensor и value хранятся в одном байте
+_FIELD_MAX = 255
+
+
+def is_binary(data) -> bool:
+    return len(data) > 0 and data[0] == MAGIC
+
+
+def _fits_binary(msg: dict) -> bool:
+    src, _, sensor, value = msg["message"].split(" ")[2:6]
+    return all(len(field.encode()) <= _FIELD_MAX for field in (src, sensor, value))
+
+
+def _split_oversized(msgs) -> tuple[list, list]:
+    """Сообщения, которые помещаются в бинарную запись, и остальные.
+
+    Остальные отправляются JSON-датаграммами (получатель определяет формат
+    каждой датаграммы отдельно), иначе struct.error остановил бы отправку.
+    """
+
+    fits, oversized = [], []
+    for msg in msgs:
+        (fits if _fits_binary(msg) else oversized).append(msg)
+    return fits, oversized
+
+
+def encode_msg(msg: dict) -> bytes:
+    """Кодирует сообщение {"recv_time", "message", ...} в запись с CRC32 по ее байтам"""
+
+    dt, tm, src, device, sensor, value = msg["message"].split(" ")[:6]
+    epoch_us = to_epoch_us(datetime.fromisoformat(dt + "T" + tm))
+    src, sensor, value = src.encode(), sensor.encode(), value.encode()
+
+    record = (
+        RECORD.pack(
+            int(msg["recv_time"]),
+            epoch_us,
+            int(device),
+            msg.get("request_id") or 0,
+            msg.get("seq") or 0,
+            len(src),
+            len(sensor),
+            len(value),
+        )
+        + src
+        + sensor
+        + value
+    )
+    return record + CHECKSUM.pack(zlib.crc32(record))
+
+
+def pack_binary_datagrams(msgs, mtu) -> list[bytes]:
+    """Упаковывает сообщения в бинарные датаграммы не больше mtu байт.
+
+    Сообщения с полем длиннее 255 байт упаковываются в JSON.
+    """
+
+    msgs, oversized = _split_oversized(msgs)
+
+    datagrams = []
+    records = []
+    size = HEADER.size
+    for msg in msgs:
+        record = encode_msg(msg)
+        if records and size + len(record) > mtu:
+            datagrams.append(_frame(records))
+            records = []
+            size = HEADER.size
+
+        records.append(record)
+        size += len(record)
+
+    if records:
+        datagrams.append(_frame(records))
+
+    return datagrams + pack_datagrams(oversized, mtu)
+
+
+def _frame(records) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, 0, len(records)) + b"".join(records)
+
+
+def _batch_groups(msgs, max_size):
+    """Серии подряд идущих сообщений для пачек.
+
+    В серии общие recv_time, source, device, sensor и request_id, seq идут
+    подряд, а несжатый размер не больше max_size байт.
+    """
+
+    group = []
+    key = None
+    size = 0
+    for msg in msgs:
+        dt, tm, src, device, sensor, value = msg["message"].split(" ")[:6]
+        epoch_us = to_epoch_us(datetime.fromisoformat(dt + "T" + tm))
+        seq = msg.get("seq") or 0
+        record = (epoch_us, seq, value.encode())
+
+        new_key = (
+            int(msg["recv_time"]),
+            src,
+            int(device),
+            sensor,
+            msg.get("request_id"),
+        )
+        if group:
+            last_us, last_seq, _ = group[-1]
+            if (
+                new_key != key
+                or seq != (last_seq + 1 if last_seq else 0)
+                or not 0 <= epoch_us - last_us <= _BATCH_DELTA_MAX
+                or size + BATCH_RECORD.size + len(record[2]) > max_size
+            ):
+                yield key, group
+                group = []
+
+        if not group:
+            key = new_key
+            size = BATCH.size + len(src) + len(sensor)
+
+        group.append(record)
+        size += BATCH_RECORD.size + len(record[2])
+
+    if group:
+        yield key, group
+
+
+def _pack_batch(key, records, mtu) -> list[bytes]:
+    recv_time, src, device, sensor, request_id = key
+    src, sensor = src.encode(), sensor.encode()
+    first_us, first_seq, _ = records[0]
+
+    parts = [
+        BATCH.pack(
+            recv_time,
+            first_us,
+            device,
+            request_id or 0,
+            first_seq,
+            len(src),
+            len(sensor),
+        ),
+        src,
+        sensor,
+    ]
+    last_us = first_us
+    for epoch_us, _, value in records:
+        parts.append(BATCH_RECORD.pack(epoch_us - last_us, len(value)))
+        parts.append(value)
+        last_us = epoch_us
+    payload = b"".join(parts)
+
+    datagram = (
+        HEADER.pack(MAGIC, VERSION, FLAG_BATCH, len(records))
+        + zlib.compress(payload)
+        + CHECKSUM.pack(zlib.crc32(payload))
+    )
+    if len(datagram) <= mtu or len(records) == 1:
+        return [datagram]
+
+    # сжатый размер заранее неизвестен, пачка делится пополам до нужного
+    half = len(records) // 2
+    return _pack_batch(key, records[:half], mtu) + _pack_batch(
+        key, records[half:], mtu
+    )
+
+
+def pack_batch_datagrams(msgs, mtu) -> list[bytes]:
+    """Упаковывает записи пачками по сериям одной пары (device, sensor).
+
+    Время записей хранится смещениями от предыдущей, пачка сжимается zlib.
+    Несжатая пачка ограничена 8 * mtu байт, сжатая делится пополам, пока
+    не поместится в mtu. Сообщения с полем длиннее 255 байт упаковываются в JSON.
+    """
+
+    msgs, oversized = _split_oversized(msgs)
+
+    datagrams = []
+    for key, records in _batch_groups(msgs, 8 * mtu):
+        datagrams.extend(_pack_batch(key, records, mtu))
+    return datagrams + pack_datagrams(oversized, mtu)
+
+
+def _split_datetime(dtm: datetime) -> list[str]:
+    # str(datetime) опускает нулевые микросекунды, в логе они всегда есть
+    return dtm.isoformat(sep=" ", timespec="microseconds").split(" ")
+
+
+def decode_datagram(data) -> list[Message]:
+    """Разбирает бинарную датаграмму в список Message.
+
+    Поля читаются из memoryview по смещениям; записи с неверной CRC32
+    пропускаются, разбор прерывается на обрезанной записи.
+    """
+
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        return []
+
+    magic, version, flags, count = HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version not in (1, VERSION):
+        print(f"Unsupported wire protocol version: {version}")
+        return []
+
+    if flags & FLAG_BATCH:
+        return _decode_batch(view[HEADER.size :], count)
+
+    record_struct = RECORD if version == VERSION else RECORD_V1
+
+    messages = []
+    offset = HEADER.size
+    for _ in range(count):
+        if offset + record_struct.size > len(view):
+            break
+
+        if version == VERSION:
+            (
+                recv_time,
+                epoch_us,
+                device,
+                request_id,
+                seq,
+                src_len,
+                sensor_len,
+                value_len,
+            ) = RECORD.unpack_from(view, offset)
+        else:
+            seq = 0
+            recv_time, epoch_us, device, request_id, src_len, sensor_len, value_len = (
+                RECORD_V1.unpack_from(view, offset)
+            )
+        strings_start = offset + record_struct.size
+        end = strings_start + src_len + sensor_len + value_len
+        if end + CHECKSUM.size > len(view):
+            break
+
+        (checksum,) = CHECKSUM.unpack_from(view, end)
+        record_start = offset
+        offset = end + CHECKSUM.size
+
+        dtm = from_epoch_us(epoch_us)
+        if checksum != zlib.crc32(view[record_start:end]):
+            print(f"Packet at {dtm} is broken")
+            continue
+
+        sensor_start = strings_start + src_len
+        value_start = sensor_start + sensor_len
+        date, time = _split_datetime(dtm)
+        messages.append(
+            Message(
+                date,
+                time,
+                str(view[strings_start:sensor_start], "ascii"),
+                str(device),
+                str(view[sensor_start:value_start], "ascii"),
+                str(view[value_start:end], "ascii"),
+                str(checksum),
+                request_id or None,
+                seq or None,
+            )
+        )
+
+    return messages
+
+
+def _decode_batch(view, count) -> list[Message]:
+    if len(view) < CHECKSUM.size:
+        return []
+
+    (checksum,) = CHECKSUM.unpack_from(view, len(view) - CHECKSUM.size)
+    try:
+        payload = zlib.decompress(view[: len(view) - CHECKSUM.size])
+    except zlib.error:
+        payload = None
+    if payload is None or len(payload) < BATCH.size or zlib.crc32(payload) != checksum:
+        print("Batch packet is broken")
+        return []
+
+    recv_time, epoch_us, device, request_id, seq, src_len, sensor_len = (
+        BATCH.unpack_from(payload, 0)
+    )
+    offset = BATCH.size
+    src = str(payload[offset : offset + src_len], "ascii")
+    offset += src_len
+    sensor = str(payload[offset : offset + sensor_len], "ascii")
+    offset += sensor_len
+
+    messages = []
+    for i in range(count):
+        if offset + BATCH_RECORD.size > len(payload):
+            break
+
+        delta_us, value_len = BATCH_RECORD.unpack_from(payload, offset)
+        offset += BATCH_RECORD.size
+        value = str(payload[offset : offset + value_len], "ascii")
+        offset += value_len
+
+        epoch_us += delta_us
+        date, time = _split_datetime(from_epoch_us(epoch_us))
+        messages.append(
+            Message(
+                date,
+                time,
+                src,
+                str(device),
+                sensor,
+                value,
+                str(checksum),
+                request_id or None,
+                seq + i if seq else None,
+            )
+        )
+
+    return messages